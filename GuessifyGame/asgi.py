@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GuessifyGame.settings')
 
 application = get_asgi_application()
+
+# Build the guesser before serving, same as the WSGI entry point
+from django.conf import settings
+
+if getattr(settings, 'GUESSER_PRELOAD', False):
+    from guesser.utils import warm_up
+
+    warm_up()
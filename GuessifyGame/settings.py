@@ -28,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'guesser.instrumentation.LatencyMiddleware',  # First, so it times the whole request
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -42,7 +43,7 @@ ROOT_URLCONF = 'GuessifyGame.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'guesser.instrumentation.TimedDjangoTemplates',  # Times template renders
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # Add this
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,6 +74,20 @@ else:
         }
     }
 
+# Cache (home-page stats). Entries expire after GUESSER_STATS_CACHE_TIMEOUT
+# seconds and are dropped when a game finishes or is confirmed. Local memory is
+# per worker process, so that drop only reaches the worker that served the
+# request: the other workers may show stats up to the timeout old. Point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. Redis or Memcached) for
+# invalidation that reaches every worker
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='guessify'),
+    }
+}
+GUESSER_STATS_CACHE_TIMEOUT = config('GUESSER_STATS_CACHE_TIMEOUT', default=60, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +130,68 @@ if not DEBUG:
         'default-src': ("'self'",),
     }
 
+# Celebrity guesser: 'policy' walks a question tree precomputed at train time,
+# 'information_gain' picks the question that best splits the remaining
+# candidates, 'importance' uses the global tree importances
+GUESSER_QUESTION_STRATEGY = config('GUESSER_QUESTION_STRATEGY', default='policy')
+
+# Trained model artifacts, keyed by a hash of the catalogue CSV
+GUESSER_ARTIFACT_DIR = config('GUESSER_ARTIFACT_DIR', default=os.path.join(BASE_DIR, 'guesser', 'artifacts'))
+
+# How often (seconds) workers look for an artifact published by `manage.py reload_model`
+GUESSER_RELOAD_INTERVAL = config('GUESSER_RELOAD_INTERVAL', default=5.0, cast=float)
+
+# Load the guesser when the WSGI app is imported (the gunicorn master with --preload)
+GUESSER_PRELOAD = config('GUESSER_PRELOAD', default=True, cast=bool)
+
+# Also write one Answer row per question. Answers are always kept compactly on
+# the GameSession (asked/yes bitmasks plus the question order); turn this off
+# to stop growing the Answer table
+GUESSER_ANSWER_ROWS = config('GUESSER_ANSWER_ROWS', default=True, cast=bool)
+
+# API games in progress are carried in signed tokens instead of GameSession
+# rows, which are only written once the game is completed
+GUESSER_STATELESS_GAMES = config('GUESSER_STATELESS_GAMES', default=False, cast=bool)
+GUESSER_GAME_TOKEN_MAX_AGE = config('GUESSER_GAME_TOKEN_MAX_AGE', default=24 * 3600, cast=int)
+
+# Latency histograms are served at /metrics/ to staff users, or to scrapers
+# sending "Authorization: Bearer <GUESSER_METRICS_TOKEN>" when it is set
+GUESSER_METRICS_TOKEN = config('GUESSER_METRICS_TOKEN', default='')
+# Add a Server-Timing header with the stage timings to every response; it
+# tells anyone how long the DB and the engine take, so only on in development
+GUESSER_SERVER_TIMING = config('GUESSER_SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Per-game traces (guesser/game_trace.py): INFO events are logged for every
+# game, the verbose DEBUG walkthrough only for a sample of games and for the
+# games of the listed users. The logger itself passes DEBUG, so sampling and
+# the user list decide; GUESSER_TRACE_LEVEL=INFO turns the walkthrough off
+GUESSER_TRACE_LEVEL = config('GUESSER_TRACE_LEVEL', default='DEBUG')
+GUESSER_TRACE_SAMPLE_RATE = config('GUESSER_TRACE_SAMPLE_RATE', default=0.0, cast=float)
+GUESSER_TRACE_USERS = config('GUESSER_TRACE_USERS', default='', cast=lambda v: [u for u in v.split(',') if u])
+
+# Log records are queued and written by a background thread, so requests never
+# block on stdout. LOG_FORMAT=json writes one JSON object per record
+LOG_FORMAT = config('LOG_FORMAT', default='plain')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+        'json': {'()': 'guesser.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'guesser.logs.QueueStreamHandler',
+            'formatter': LOG_FORMAT,
+        },
+    },
+    'root': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO')},
+    'loggers': {
+        'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'guesser.trace': {'level': GUESSER_TRACE_LEVEL},
+    },
+}
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
@@ -20,6 +20,7 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('Auth.urls')),  # Auth routes under /auth/
+    path('api/v1/', include('guesser.api_urls')),  # JSON game API
     path('', include('guesser.urls')), 
     path('admin_auth/', include('admin_auth.urls')),  # Admin auth routes
 ]
\ No newline at end of file
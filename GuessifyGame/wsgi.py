@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GuessifyGame.settings')
 
 application = get_wsgi_application()
+
+# Build the guesser once at import time. Under `gunicorn --preload` this runs in
+# the master, and the forked workers share it copy-on-write.
+from django.conf import settings
+
+if getattr(settings, 'GUESSER_PRELOAD', False):
+    from guesser.utils import warm_up
+
+    warm_up()
+
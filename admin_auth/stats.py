@@ -0,0 +1,48 @@
+"""
+Counters for the admin dashboards, fetched in a single round trip.
+
+User counters are a conditional aggregation over auth_user; game counters come
+from the materialised GameStats global row (see guesser/stats.py) as scalar
+subqueries in the same SELECT. Per-user counters for the users list are joined
+from the player's own GameStats row, so a page of users is one query.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Case, Count, F, Max, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from guesser.models import GameStats
+from guesser.stats import GLOBAL_ROW
+
+
+def _game_counter(field):
+    row = GameStats.objects.filter(key=GLOBAL_ROW).values(field)[:1]
+    return Coalesce(Max(Subquery(row)), 0)
+
+
+def get_counters():
+    """All user and game counters used by the admin pages"""
+    counters = User.objects.aggregate(
+        total_users=Count('id'),
+        staff_users=Count('id', filter=Q(is_staff=True)),
+        active_users=Count('id', filter=Q(is_active=True)),
+        superusers=Count('id', filter=Q(is_superuser=True)),
+        total_games=_game_counter('total_games'),
+        completed_games=_game_counter('completed_games'),
+        correct_games=_game_counter('correct_games'),
+    )
+    counters['wrong_games'] = counters['completed_games'] - counters['correct_games']
+    counters['pending_games'] = counters['total_games'] - counters['completed_games']
+    return counters
+
+
+def with_game_stats(users):
+    """Annotate users with games_played, completed_games and win_rate (a percentage)"""
+    return users.annotate(
+        games_played=Coalesce(F('game_stats__total_games'), 0),
+        completed_games=Coalesce(F('game_stats__completed_games'), 0),
+        win_rate=Case(
+            When(completed_games__gt=0,
+                 then=F('game_stats__correct_games') * 100 / F('completed_games')),
+            default=Value(0),
+        ),
+    )
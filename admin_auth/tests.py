@@ -1,3 +1,154 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
 
-# Create your tests here.
+from admin_auth.stats import get_counters
+from guesser.models import GameSession, GameStats, Answer
+from guesser.stats import rebuild
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class DashboardQueriesTests(TestCase):
+    """Pin the number of queries each admin page issues"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password123')
+        players = [User.objects.create_user(f'player{i}', f'player{i}@example.com', 'password123')
+                   for i in range(3)]
+        for i in range(12):
+            game = GameSession.objects.create(
+                session_key=f'game-{i}',
+                user=players[i % 3],
+                is_completed=i % 4 != 0,
+                is_correct=i % 2 == 0,
+                guessed_celebrity='Adele',
+            )
+            Answer.objects.create(game_session=game, feature='male', answer='no')
+        rebuild()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_counters(self):
+        with self.assertNumQueries(1):
+            counters = get_counters()
+        self.assertEqual(counters['total_users'], 4)
+        self.assertEqual(counters['superusers'], 1)
+        self.assertEqual(counters['total_games'], 12)
+        self.assertEqual(counters['completed_games'], 9)
+        self.assertEqual(counters['correct_games'], 3)
+        self.assertEqual(counters['wrong_games'], 6)
+        self.assertEqual(counters['pending_games'], 3)
+
+    def test_deleting_a_user_drops_their_games_from_the_counters(self):
+        player = User.objects.get(username='player0')
+        response = self.client.post(f'/admin_auth/users/{player.id}/delete/')
+        self.assertTrue(response.json()['success'])
+        counters = get_counters()
+        # player0 had games 0, 3, 6, 9: 3, 6, 9 completed, 6 correct
+        self.assertEqual(counters['total_games'], 8)
+        self.assertEqual(counters['completed_games'], 6)
+        self.assertEqual(counters['correct_games'], 2)
+
+    def test_deleting_a_game_from_the_django_admin(self):
+        game = GameSession.objects.get(session_key='game-6')  # player0's, completed and correct
+        response = self.client.post(f'/admin/guesser/gamesession/{game.id}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        counters = get_counters()
+        self.assertEqual(counters['total_games'], 11)
+        self.assertEqual(counters['completed_games'], 8)
+        self.assertEqual(counters['correct_games'], 2)
+        player_stats = GameStats.objects.get(user__username='player0')
+        self.assertEqual((player_stats.total_games, player_stats.correct_games), (3, 0))
+
+    def test_dashboard_queries(self):
+        # session, user, counters, latest users, recent games
+        with self.assertNumQueries(5):
+            response = self.client.get('/admin_auth/start/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['nb_games'], 12)
+
+    def test_games_list_queries(self):
+        # games page, counters; answers are only fetched on demand
+        with self.assertNumQueries(2):
+            response = self.client.get('/admin_auth/games_list/?limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_games'], 3)
+        self.assertEqual(len(response.context['games']), 5)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_games_page_walks_every_game(self):
+        seen, cursor = [], ''
+        while True:
+            # session, user, games page
+            with self.assertNumQueries(3):
+                response = self.client.get('/admin_auth/games_list/page/',
+                                           {'limit': 5, 'cursor': cursor})
+            data = response.json()
+            seen += [game['id'] for game in data['games']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = list(GameSession.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_games_page_filters(self):
+        response = self.client.get('/admin_auth/games_list/page/',
+                                   {'completed': 'true', 'correct': 'false', 'user': 'player1'})
+        games = response.json()['games']
+        self.assertEqual(len(games), 2)
+        self.assertTrue(all(g['is_completed'] and g['is_correct'] is False for g in games))
+
+        response = self.client.get('/admin_auth/games_list/page/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_games_page_is_staff_only(self):
+        self.client.force_login(User.objects.get(username='player0'))
+        response = self.client.get('/admin_auth/games_list/page/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_users_list_queries(self):
+        # session, user, counters, users
+        with self.assertNumQueries(4):
+            response = self.client.get('/admin_auth/users_list/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['staff_count'], 1)
+
+    def test_users_page_aggregates(self):
+        # session, user, then a page of users with their game counters in a single query
+        with self.assertNumQueries(3):
+            response = self.client.get('/admin_auth/users_list/page/', {'sort': '-games', 'q': 'player'})
+        users = response.json()['users']
+        self.assertEqual([u['games_played'] for u in users], [4, 4, 4])
+        # player0: games 0, 3, 6, 9 -> completed 3, 6, 9, correct 6
+        self.assertEqual([u['win_rate'] for u in users], [33, 33, 33])
+
+    def test_users_page_walks_every_user(self):
+        seen, cursor = [], ''
+        while True:
+            data = self.client.get('/admin_auth/users_list/page/',
+                                   {'sort': '-win_rate', 'limit': 1, 'cursor': cursor}).json()
+            seen += [u['username'] for u in data['users']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        # Ties on win rate fall back to the newest id; admin has no games
+        self.assertEqual(seen, ['player2', 'player1', 'player0', 'admin'])
+
+    def test_users_page_joined_walks_the_primary_key(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/admin_auth/users_list/page/', {'sort': '-joined', 'limit': 2}).json()
+        self.assertNotIn('date_joined', queries[-1]['sql'].split('ORDER BY')[-1])
+        data = self.client.get('/admin_auth/users_list/page/',
+                               {'sort': '-joined', 'limit': 2, 'cursor': data['next_cursor']}).json()
+        self.assertEqual([u['username'] for u in data['users']], ['player0', 'admin'])
+
+    def test_users_page_is_staff_only(self):
+        self.client.force_login(User.objects.get(username='player0'))
+        response = self.client.get('/admin_auth/users_list/page/')
+        self.assertEqual(response.status_code, 302)
@@ -7,7 +7,9 @@ urlpatterns = [
     path('nb_users/', views.admin_dashboard, name='nb_users'),
     path('nb_games/', views.admin_dashboard, name='nb_games'),
 path('users_list/',views.admin_users,name='users_list'),
+path('users_list/page/', views.users_page, name='users_page'),
 path('games_list/',views.admin_games,name='games_list'),
+path('games_list/page/', views.games_page, name='games_page'),
 path('games_list/<int:game_id>/answers/', views.game_answers, name='game_answers'),  
     path('games/<int:game_id>/delete/', views.delete_game, name='delete_game'),  
 
@@ -8,26 +8,28 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_protect
 from guesser.models import GameSession,Answer
+from admin_auth.stats import get_counters, with_game_stats
+from guesser import game_state
+from guesser.utils import get_guesser
+from admin_auth.pagination import InvalidCursor, get_page_size, keyset_page
+from django.db.models import Q
+from django.utils import dateformat, timezone
+from django.utils.dateparse import parse_date
+import datetime
 # Create your views here.
 def admin_dashboard(request):
-       # Total games
-    total_games = GameSession.objects.count()
-    
-    # Completed games
-    completed_games = GameSession.objects.filter(is_completed=True).count()
-    
-    # Pending games (started but not completed)
-    pending_games = GameSession.objects.filter(is_completed=False).count()
-    
-    # Correct guesses
-    correct_guesses = GameSession.objects.filter(is_completed=True, is_correct=True).count()
+    # Game and user counters in one query
+    counters = get_counters()
+    total_games = counters['total_games']
+    completed_games = counters['completed_games']
+    correct_guesses = counters['correct_games']
     
     # user_sessions = GameSession.objects.all()
     all_users=User.objects.all()[:3]
-    recent_games=GameSession.objects.filter(is_completed=True).order_by('-created_at')[:3]
-    user_total = User.objects.count()
+    recent_games=GameSession.objects.filter(is_completed=True).select_related('user').order_by('-created_at')[:3]
+    user_total = counters['total_users']
     # user_correct = user_sessions.filter(is_correct=True).count()
-    user_win_rate = round((correct_guesses / total_games * 100)) if user_total > 0 else 0 
+    user_win_rate = round((correct_guesses / total_games * 100)) if total_games > 0 else 0
     context = {
         'title': 'Number of Games',
         'nb_users':user_total,
@@ -44,15 +46,21 @@ def admin_dashboard(request):
 # @staff_member_required(login_url='login')
 def admin_users(request):
     """Admin view to manage users"""
-    users = User.objects.all().order_by('date_joined')
+    # First page only; the rest is loaded on scroll from users_page
+    filters = _user_filters(request.GET)
+    users, next_cursor = _users_page(filters, page_size=get_page_size(request.GET.get('limit')))
     
-    # Count stats
-    staff_count = User.objects.filter(is_staff=True).count()
-    active_count = User.objects.filter(is_active=True).count()
-    superuser_count = User.objects.filter(is_superuser=True).count()
+    # Count stats (one query)
+    counters = get_counters()
+    staff_count = counters['staff_users']
+    active_count = counters['active_users']
+    superuser_count = counters['superusers']
     
     context = {
         'users': users,
+        'next_cursor': next_cursor,
+        'filters': filters,
+        'total_users': counters['total_users'],
         'staff_count': staff_count,
         'active_count': active_count,
         'superuser_count': superuser_count,
@@ -61,24 +69,110 @@ def admin_users(request):
     return render(request, 'admin_users.html', context)
 
 
+# Users list sort options -> (ordering fields, descending); id ends each one
+# as the tie-breaker. Join order is id order (auth_user.date_joined has no
+# index), so those pages walk the primary key.
+USER_SORTS = {
+    'joined': (('id',), False),
+    '-joined': (('id',), True),
+    'username': (('username', 'id'), False),
+    '-username': (('username', 'id'), True),
+    '-games': (('games_played', 'id'), True),
+    'games': (('games_played', 'id'), False),
+    '-win_rate': (('win_rate', 'id'), True),
+    'win_rate': (('win_rate', 'id'), False),
+}
+
+
+def _user_filters(params):
+    """Users list filters and sort from the query string"""
+    sort = params.get('sort', 'joined')
+    return {
+        'q': params.get('q', '').strip(),
+        'role': params.get('role') if params.get('role') in ('staff', 'active') else '',
+        'sort': sort if sort in USER_SORTS else 'joined',
+    }
+
+
+def _users_page(filters, cursor=None, page_size=None):
+    """One page of users with their game counters, in a single query"""
+    users = with_game_stats(User.objects.all())
+    if filters['q']:
+        users = users.filter(Q(username__icontains=filters['q']) | Q(email__icontains=filters['q']))
+    if filters['role'] == 'staff':
+        users = users.filter(is_staff=True)
+    elif filters['role'] == 'active':
+        users = users.filter(is_active=True)
+    
+    fields, descending = USER_SORTS[filters['sort']]
+    return keyset_page(users, fields, cursor=cursor,
+                       page_size=page_size or get_page_size(None), descending=descending)
+
+
+def _user_row(user):
+    """One users list row for the infinite scroll"""
+    date_joined = timezone.localtime(user.date_joined)
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_staff': user.is_staff,
+        'is_active': user.is_active,
+        'is_superuser': user.is_superuser,
+        'games_played': user.games_played,
+        'win_rate': user.win_rate,
+        'date': dateformat.format(date_joined, 'M d, Y'),
+        'time': dateformat.format(date_joined, 'g:i A'),
+    }
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def users_page(request):
+    """Next page of the users list as JSON (cursor from the previous page)"""
+    try:
+        users, next_cursor = _users_page(
+            _user_filters(request.GET),
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request.GET.get('limit')),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'users': [_user_row(user) for user in users],
+        'next_cursor': next_cursor,
+    })
+
+
 #@staff_member_required(login_url='login')
 def admin_games(request):
     """Admin view to see all games with user associations"""
-    # Get all games ordered by most recent
-    games = GameSession.objects.select_related('user').prefetch_related('answers').order_by('-created_at')
+    # First page only; the rest is loaded on scroll from games_page
+    filters = _game_filters(request.GET)
+    games, next_cursor = keyset_page(
+        _filter_games(GameSession.objects.select_related('user'), filters),
+        GAME_ORDERING, page_size=get_page_size(request.GET.get('limit')),
+    )
     
-    # Calculate stats
-    total_games = games.count()
-    completed_games = games.filter(is_completed=True).count()
-    correct_games = games.filter(is_completed=True, is_correct=True).count()
-    wrong_games = games.filter(is_completed=True, is_correct=False).count()
-    pending_games = games.filter(is_completed=False).count()
+    # Stats from the shared counters query
+    counters = get_counters()
+    total_games = counters['total_games']
+    completed_games = counters['completed_games']
+    correct_games = counters['correct_games']
+    wrong_games = counters['wrong_games']
+    pending_games = counters['pending_games']
     
     # Calculate win rate
     win_rate = round((correct_games / completed_games * 100)) if completed_games > 0 else 0
     
     context = {
         'games': games,
+        'next_cursor': next_cursor,
+        'filters': filters,
         'total_games': total_games,
         'completed_games': completed_games,
         'correct_games': correct_games,
@@ -90,6 +184,93 @@ def admin_games(request):
     return render(request, 'admin_games.html', context)
 
 
+# Games list ordering for keyset pagination; id breaks ties between equal timestamps
+GAME_ORDERING = ('created_at', 'id')
+
+
+def _parse_bool(value):
+    return {'true': True, 'false': False}.get((value or '').lower())
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _game_filters(params):
+    """Games list filters from the query string; unknown values are ignored"""
+    return {
+        'q': params.get('q', '').strip(),
+        'user': params.get('user', '').strip(),
+        'completed': _parse_bool(params.get('completed')),
+        'correct': _parse_bool(params.get('correct')),
+        'date_from': _parse_day(params.get('from')),
+        'date_to': _parse_day(params.get('to')),
+    }
+
+
+def _filter_games(games, filters):
+    """Apply the games list filters in SQL"""
+    if filters['q']:
+        q = filters['q']
+        games = games.filter(Q(user__username__icontains=q) | Q(guessed_celebrity__icontains=q)
+                             | Q(session_key__icontains=q))
+    if filters['user']:
+        games = games.filter(user__username=filters['user'])
+    if filters['completed'] is not None:
+        games = games.filter(is_completed=filters['completed'])
+    if filters['correct'] is not None:
+        games = games.filter(is_correct=filters['correct'])
+    # Whole days in the current time zone, as ranges on created_at so the index is usable
+    tz = timezone.get_current_timezone()
+    if filters['date_from']:
+        start = datetime.datetime.combine(filters['date_from'], datetime.time.min)
+        games = games.filter(created_at__gte=timezone.make_aware(start, tz))
+    if filters['date_to']:
+        end = datetime.datetime.combine(filters['date_to'] + datetime.timedelta(days=1), datetime.time.min)
+        games = games.filter(created_at__lt=timezone.make_aware(end, tz))
+    return games
+
+
+def _game_row(game):
+    """One games list row for the infinite scroll"""
+    created_at = timezone.localtime(game.created_at)
+    return {
+        'id': game.id,
+        'username': game.user.username if game.user else '',
+        'email': game.user.email if game.user else '',
+        'celebrity': game.guessed_celebrity,
+        'questions_count': game.question_count,
+        'is_completed': game.is_completed,
+        'is_correct': game.is_correct,
+        'date': dateformat.format(created_at, 'M d, Y'),
+        'time': dateformat.format(created_at, 'g:i A'),
+    }
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def games_page(request):
+    """Next page of the games list as JSON (cursor from the previous page)"""
+    try:
+        games, next_cursor = keyset_page(
+            _filter_games(GameSession.objects.select_related('user'), _game_filters(request.GET)),
+            GAME_ORDERING,
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request.GET.get('limit')),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'games': [_game_row(game) for game in games],
+        'next_cursor': next_cursor,
+    })
+
+
 @staff_member_required
 @require_http_methods(["GET"])
 def game_details(request, game_id):
@@ -118,7 +299,7 @@ def game_details(request, game_id):
                 'username': game.user.username,
                 'email': game.user.email,
                 'celebrity': game.guessed_celebrity,
-                'questions_count': game.answers.count(),
+                'questions_count': game.question_count,
                 'is_completed': game.is_completed,
                 'result_color': result_color,
                 'result_icon': result_icon,
@@ -166,6 +347,7 @@ def delete_game(request, game_id):
     """Delete a game"""
     try:
         game = get_object_or_404(GameSession, id=game_id)
+        # The stats are updated by guesser.signals
         game.delete()
         return JsonResponse({'success': True, 'message': 'Game deleted successfully'})
     except Exception as e:
@@ -175,12 +357,14 @@ def delete_game(request, game_id):
 def game_answers(request, game_id):
     try:
         game = GameSession.objects.get(id=game_id)
-        # Change 'game' to 'game_session' to match your model
-        answers = Answer.objects.filter(game_session=game).values('id', 'answer', 'feature', 'created_at')
+        # Answer rows, or the compact answers stored on the game when it has none
+        answers = game_state.answer_history(game, get_guesser(game.model_version or None))
+        # None when the game has no Answer rows and its catalogue's features are unknown
+        unreplayable = answers is None
         
         # Build answers with question from feature
         answers_list = []
-        for answer in answers:
+        for answer in answers or []:
             answers_list.append({
                 'id': answer['id'],
                 'question': answer.get('feature', 'Unknown'),  # Assuming 'feature' contains the question
@@ -194,7 +378,8 @@ def game_answers(request, game_id):
                 'celebrity': game.guessed_celebrity,
                 'username': game.user.username,
             },
-            'answers': answers_list
+            'answers': answers_list,
+            'unreplayable': unreplayable,
         })
     except GameSession.DoesNotExist:
         return JsonResponse({
@@ -323,6 +508,7 @@ def delete_user(request, user_id):
             }, status=400)
         
         username = user.username
+        # Deletes their games too; guesser.signals takes them out of the stats
         user.delete()
         
         return JsonResponse({
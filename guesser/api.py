@@ -0,0 +1,202 @@
+"""
+Versioned JSON game API (mounted under /api/v1/) for client-rendered front
+ends, built on the same game flow as the pages (guesser/gameplay.py).
+
+A game is identified by a signed token returned by `start`, not by the Django
+session, so only starting a game needs the logged-in user. State reads carry
+an ETag and answer 304 when the game hasn't changed. With
+GUESSER_STATELESS_GAMES on, the token of a game in progress carries its whole
+state (see game_tokens.py) and changes with every answer; clients always use
+the latest `game` they were sent.
+
+    POST games/                   start a game, returns its state and first question
+    GET  games/<token>/           current state
+    POST games/<token>/answer/    {"feature", "answer"}, returns the next state
+    GET  games/<token>/guess/     the final guess (POST: guess now)
+    POST games/<token>/confirm/   {"correct": true/false}
+"""
+import json
+
+from django.core import signing
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import gameplay, game_state, game_tokens
+from .models import GameSession
+from .utils import get_guesser
+
+TOKEN_SALT = 'guesser.api.game'
+
+
+def game_token(game_session, guesser):
+    """Signed identifier of a game (or its whole state, if stateless), handed to API clients"""
+    if game_state.is_stateless(game_session):
+        return game_tokens.dumps(game_session, guesser)
+    return signing.Signer(salt=TOKEN_SALT).sign(str(game_session.pk))
+
+
+def _get_game(token):
+    """The game for a token, or None if the token is forged or the game is gone"""
+    try:
+        pk = signing.Signer(salt=TOKEN_SALT).unsign(token)
+    except signing.BadSignature:
+        # A stateless game in progress
+        return game_tokens.loads(token)
+    return GameSession.objects.filter(pk=pk).first()
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _body(request):
+    """Request data from a JSON body or a regular form post"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _etag(game_session):
+    if game_state.is_stateless(game_session):
+        # Only answers change a game in progress
+        return f'"{game_session.session_key}-{game_session.question_count}"'
+    # Every change to a game saves it, which bumps updated_at
+    return f'"{game_session.pk}-{game_session.updated_at.timestamp():.6f}"'
+
+
+def _state(game_session, guesser):
+    """Compact state payload"""
+    remaining = guesser.count_candidates(game_state.remaining_mask(game_session))
+    state = {
+        'game': game_token(game_session, guesser),
+        'status': 'guessed' if game_session.is_completed else 'playing',
+        'asked': game_session.question_count,
+        'remaining': remaining,
+    }
+    if game_session.is_completed:
+        state['guess'] = game_session.guessed_celebrity
+        state['correct'] = game_session.is_correct
+    else:
+        feature = game_session.last_feature
+        state['question'] = {'feature': feature, 'text': guesser.format_feature_question(feature)}
+        state['progress'] = round(gameplay.progress_percentage(guesser, remaining, game_session.question_count))
+    return state
+
+
+@require_POST
+def start(request):
+    """Start a game for the logged-in player"""
+    if not request.user.is_authenticated:
+        return _error('Authentication required', 401)
+
+    guesser = get_guesser()
+    if game_tokens.is_enabled():
+        game_session = game_tokens.new_game(request.user, guesser)
+    else:
+        game_session = gameplay.start_game(request.user, guesser)
+    gameplay.next_step(game_session, guesser)
+    return JsonResponse(_state(game_session, guesser), status=201)
+
+
+@require_GET
+def state(request, token):
+    """Current state of a game; supports If-None-Match"""
+    game_session = _get_game(token)
+    if game_session is None:
+        return _error('Game not found', 404)
+
+    etag = _etag(game_session)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        guesser = game_state.get_game_guesser(game_session)
+        response = JsonResponse(_state(game_session, guesser))
+    response['ETag'] = etag
+    # Clients may keep the state but must revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# The signed game token authorises these, not the session cookie, so CSRF
+# protection doesn't apply
+@csrf_exempt
+@require_POST
+def answer(request, token):
+    """Answer the current question and get the next state"""
+    game_session = _get_game(token)
+    if game_session is None:
+        return _error('Game not found', 404)
+    if game_session.is_completed:
+        return _error('Game is already finished', 409)
+
+    data = _body(request)
+    if data is None:
+        return _error('Invalid JSON', 400)
+    guesser = game_state.get_game_guesser(game_session)
+    feature, answer_code = data.get('feature'), data.get('answer')
+    if feature not in guesser.feature_index or answer_code not in gameplay.ANSWERS:
+        return _error('Unknown feature or answer', 400)
+
+    # A repeated answer (e.g. a retried request) is ignored and the state returned as is
+    gameplay.record_answer(game_session, guesser, feature, answer_code)
+    try:
+        gameplay.next_step(game_session, guesser)
+    except IntegrityError:
+        # An old token of a stateless game that was already completed
+        return _error('Game is already finished', 409)
+    return JsonResponse(_state(game_session, guesser))
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def guess(request, token):
+    """The final guess; POST makes it now if the game is still in progress"""
+    game_session = _get_game(token)
+    if game_session is None:
+        return _error('Game not found', 404)
+
+    guesser = game_state.get_game_guesser(game_session)
+    if not game_session.is_completed:
+        if request.method != 'POST':
+            return _error('No guess yet', 409)
+        try:
+            gameplay.make_guess(game_session, guesser, game_state.remaining_mask(game_session))
+        except IntegrityError:
+            return _error('Game is already finished', 409)
+
+    result = gameplay.result(game_session, guesser)
+    return JsonResponse({
+        'game': game_token(game_session, guesser),
+        'guess': result['guessed_celebrity'],
+        'confidence': round(result['confidence'], 1),
+        'matches': result['remaining_celebrities'],
+        'asked': result['questions_asked'],
+        'correct': result['is_correct'],
+    })
+
+
+@csrf_exempt
+@require_POST
+def confirm(request, token):
+    """The player says whether the guess was right"""
+    game_session = _get_game(token)
+    if game_session is None:
+        return _error('Game not found', 404)
+    if not game_session.is_completed:
+        return _error('No guess yet', 409)
+
+    data = _body(request)
+    correct = data.get('correct') if data is not None else None
+    if isinstance(correct, str):
+        correct = {'true': True, 'yes': True, 'false': False, 'no': False}.get(correct.lower())
+    if not isinstance(correct, bool):
+        return _error('"correct" must be true or false', 400)
+
+    gameplay.confirm(game_session, correct)
+    return JsonResponse({'game': token, 'correct': correct})
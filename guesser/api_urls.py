@@ -0,0 +1,10 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('games/', api.start, name='api_start'),
+    path('games/<str:token>/', api.state, name='api_state'),
+    path('games/<str:token>/answer/', api.answer, name='api_answer'),
+    path('games/<str:token>/guess/', api.guess, name='api_guess'),
+    path('games/<str:token>/confirm/', api.confirm, name='api_confirm'),
+]
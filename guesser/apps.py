@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class GuesserConfig(AppConfig):
     name = 'guesser'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,183 @@
+"""
+Versioned on-disk artifacts for the trained guesser.
+
+An artifact holds the fitted model, the encoded feature matrix, the names and
+the precomputed indexes, keyed by a hash of the catalogue CSV. Workers load it
+in milliseconds and only retrain when the data (or the format) changes.
+
+Each catalogue's feature names are also kept in a small JSON file that is
+never tied to the artifact format: games store their answers as feature
+indices, and those stay readable after the artifact itself is gone.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import joblib
+import sklearn
+
+from .decision_tree import Guessify
+
+# Bump when the artifact layout changes so old files are ignored
+ARTIFACT_VERSION = 3
+
+# Pointer to the currently published artifact; running workers watch its mtime
+CURRENT_POINTER = 'current.json'
+
+# model_version of the games whose compact answers were backfilled from their
+# Answer rows (migration 0013); its feature names ship in guesser/data
+LEGACY_VERSION = 'legacy'
+
+
+def data_hash(csv_path):
+    """SHA-256 of the catalogue file"""
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_path(artifact_dir, digest):
+    """Artifact file name for a given catalogue hash"""
+    return os.path.join(artifact_dir, f"guessify-v{ARTIFACT_VERSION}-{digest[:16]}.joblib")
+
+
+def build(csv_path, question_strategy='importance'):
+    """Load the CSV and train a fresh guesser"""
+    guesser = Guessify(question_strategy=question_strategy)
+    guesser.load_data(csv_path)
+    guesser.train_model()
+    return guesser
+
+
+def _atomic_write(path, write):
+    """Write through a temp file + rename so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def feature_names_path(artifact_dir, digest):
+    return os.path.join(artifact_dir, f"features-{digest}.json")
+
+
+def save_feature_names(artifact_dir, digest, feature_names):
+    """Record the feature names (in index order) of the catalogue `digest`"""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump({'data_hash': digest, 'feature_names': list(feature_names)}, f)
+    return _atomic_write(feature_names_path(artifact_dir, digest), write)
+
+
+def load_feature_names(artifact_dir, digest):
+    """Feature names of the catalogue `digest`, or None if they were never recorded"""
+    try:
+        with open(feature_names_path(artifact_dir, digest)) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('data_hash') != digest:
+        return None
+    return data.get('feature_names')
+
+
+def save(guesser, path, digest):
+    """Write the artifact atomically"""
+    payload = {
+        'version': ARTIFACT_VERSION,
+        'data_hash': digest,
+        'sklearn_version': sklearn.__version__,
+        'guesser': guesser.export_artifact(),
+    }
+    save_feature_names(os.path.dirname(path), digest, guesser.feature_names)
+    # Uncompressed so NumPy arrays can be memory-mapped on load
+    return _atomic_write(path, lambda tmp_path: joblib.dump(payload, tmp_path))
+
+
+def pointer_path(artifact_dir):
+    return os.path.join(artifact_dir, CURRENT_POINTER)
+
+
+def write_pointer(artifact_dir, digest):
+    """Mark the artifact for `digest` as the one every worker should serve"""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': ARTIFACT_VERSION, 'data_hash': digest}, f)
+    return _atomic_write(pointer_path(artifact_dir), write)
+
+
+def read_pointer(artifact_dir):
+    """Data hash of the published artifact, or None"""
+    try:
+        with open(pointer_path(artifact_dir)) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if pointer.get('version') != ARTIFACT_VERSION:
+        return None
+    return pointer.get('data_hash')
+
+
+def load(path, digest=None, question_strategy=None):
+    """
+    Load a guesser from an artifact, or return None if it is missing, stale
+    or was written by another format/scikit-learn version
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        payload = joblib.load(path, mmap_mode='r')
+    except Exception:
+        return None
+
+    if payload.get('version') != ARTIFACT_VERSION:
+        return None
+    if payload.get('sklearn_version') != sklearn.__version__:
+        return None
+    if digest is not None and payload.get('data_hash') != digest:
+        return None
+
+    guesser = Guessify.from_artifact(payload['guesser'], question_strategy=question_strategy)
+    guesser.data_hash = payload['data_hash']
+    if not os.path.exists(feature_names_path(os.path.dirname(path), guesser.data_hash)):
+        # Artifacts written before the feature names were kept alongside
+        try:
+            save_feature_names(os.path.dirname(path), guesser.data_hash, guesser.feature_names)
+        except OSError:
+            pass
+    return guesser
+
+
+def publish(csv_path, artifact_dir, question_strategy='importance'):
+    """
+    Retrain from the CSV, write the artifact and point the running workers
+    at it; returns (guesser, path)
+    """
+    digest = data_hash(csv_path)
+    guesser = build(csv_path, question_strategy)
+    guesser.data_hash = digest
+    path = save(guesser, artifact_path(artifact_dir, digest), digest)
+    write_pointer(artifact_dir, digest)
+    return guesser, path
+
+
+def load_or_build(csv_path, artifact_dir, question_strategy='importance'):
+    """Load the artifact for the current CSV, training and publishing it if needed"""
+    digest = data_hash(csv_path)
+    guesser = load(artifact_path(artifact_dir, digest), digest, question_strategy)
+    if guesser is not None:
+        if read_pointer(artifact_dir) != digest:
+            write_pointer(artifact_dir, digest)
+        return guesser
+    guesser, _ = publish(csv_path, artifact_dir, question_strategy)
+    return guesser
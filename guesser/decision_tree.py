@@ -1,11 +1,28 @@
+import logging
+import random
+from itertools import islice
+from types import MappingProxyType
 import pandas as pd
 import numpy as np
 from sklearn.tree import DecisionTreeClassifier
 # from sklearn.model_selection import train_test_split 
 from sklearn.metrics import accuracy_score
 
+from .metrics import timer
+
+QUESTION_STRATEGIES = ('importance', 'information_gain', 'policy')
+
+# Policy tree node id for answers that left the precomputed tree
+OFF_POLICY = -1
+
+logger = logging.getLogger(__name__)
+
+
 class Guessify:
-    def __init__(self):
+    def __init__(self, question_strategy='importance'):
+        if question_strategy not in QUESTION_STRATEGIES:
+            raise ValueError(f"Unknown question strategy: {question_strategy}")
+        self.question_strategy = question_strategy
         self.model = None
         self.feature_names = None
         self.celebrities = None
@@ -15,40 +32,188 @@ class Guessify:
         self.y_train = None
         self.y_test = None
         self.accuracy = None
+        # Candidate index: one bitset per (feature, value), bit i = row i
+        self.X = None
+        self.feature_index = None
+        self.yes_bits = None
+        self.no_bits = None
+        self.all_bits = 0
+        # Precomputed question policy (flat arrays, node 0 is the root)
+        self.policy = None
+        # Hash of the catalogue this guesser was trained on
+        self.data_hash = None
+        # Row index -> index in model.classes_
+        self.row_class = None
         
     def load_data(self, filepath):
-        """Load the celebrity dataset"""
-        # Read the file - use comma separator
-        self.data = pd.read_csv(filepath, sep=',')
-        self.data = self.data.drop_duplicates()
-        
-        # Remove any rows with missing values (like Lady Gaga's incomplete row)
-        self.data = self.data.dropna()
+        """Load the celebrity dataset: a CSV, or its columnar .npz form (see guesser/synthetic.py)"""
+        if str(filepath).endswith('.npz'):
+            self.data = self.read_columnar(filepath)
+        else:
+            self.data = self.read_csv(filepath)
         
-        self.celebrities = self.data['name'].values
+        # Fixed-width strings rather than objects: no refcounts, so the pages can stay shared
+        self.celebrities = self.data['name'].to_numpy(dtype=str)
+        self.celebrities.setflags(write=False)
         
         # Get feature columns (all except 'name')
         self.feature_names = [col for col in self.data.columns if col != 'name']
         
-        # Convert 'yes'/'no' to 1/0 for all feature columns
-        for col in self.feature_names:
-            self.data[col] = self.data[col].map({'yes': 1, 'no': 0})
+        self.build_index()
         
-        # Print info for debugging
-        print(f"Loaded {len(self.data)} celebrities")
-        print(f"Features: {len(self.feature_names)}")
+        logger.info("Loaded %d celebrities, %d features", len(self.data), len(self.feature_names))
         
         return self.data
     
+    @staticmethod
+    def read_csv(filepath):
+        """Catalogue rows from the CSV, answers as 1/0"""
+        # Read the file - use comma separator
+        data = pd.read_csv(filepath, sep=',')
+        data = data.drop_duplicates()
+        
+        # Remove any rows with missing values (like Lady Gaga's incomplete row)
+        data = data.dropna().reset_index(drop=True)
+        
+        # Convert 'yes'/'no' to 1/0 for all feature columns
+        for col in data.columns:
+            if col != 'name':
+                data[col] = data[col].map({'yes': 1, 'no': 0})
+        return data
+    
+    @staticmethod
+    def read_columnar(filepath):
+        """
+        Catalogue rows from a columnar .npz: the names, the feature names and
+        one little-endian bitset per feature (bit i = row i)
+        """
+        with np.load(filepath) as archive:
+            names = archive['names']
+            columns = np.unpackbits(archive['columns'], axis=1, count=len(names), bitorder='little')
+            data = pd.DataFrame(columns.T, columns=archive['features'].tolist())
+        data.insert(0, 'name', names)
+        return data
+    
+    def build_index(self):
+        """Precompute one bitset per (feature, value) pair from the loaded data"""
+        self.X = self.data[self.feature_names].to_numpy(dtype=np.uint8)
+        self.X.setflags(write=False)
+        self.feature_index = {feature: i for i, feature in enumerate(self.feature_names)}
+        
+        n = len(self.X)
+        self.all_bits = (1 << n) - 1
+        self.yes_bits = []
+        self.no_bits = []
+        for i in range(len(self.feature_names)):
+            packed = np.packbits(self.X[:, i], bitorder='little').tobytes()
+            yes = int.from_bytes(packed, 'little')
+            self.yes_bits.append(yes)
+            self.no_bits.append(self.all_bits & ~yes)
+    
+    def export_artifact(self):
+        """Everything needed to serve games, without the pandas DataFrame"""
+        return {
+            'question_strategy': self.question_strategy,
+            'feature_names': list(self.feature_names),
+            'celebrities': self.celebrities,
+            'X': self.X,
+            'yes_bits': self.yes_bits,
+            'no_bits': self.no_bits,
+            'all_bits': self.all_bits,
+            'model': self.model,
+            'policy': None if self.policy is None else dict(self.policy),
+        }
+    
+    @classmethod
+    def from_artifact(cls, artifact, question_strategy=None):
+        """Rebuild a trained guesser from export_artifact() output"""
+        guesser = cls(question_strategy or artifact['question_strategy'])
+        guesser.feature_names = artifact['feature_names']
+        guesser.feature_index = {feature: i for i, feature in enumerate(guesser.feature_names)}
+        guesser.celebrities = artifact['celebrities']
+        guesser.X = artifact['X']
+        guesser.yes_bits = artifact['yes_bits']
+        guesser.no_bits = artifact['no_bits']
+        guesser.all_bits = artifact['all_bits']
+        guesser.model = artifact['model']
+        guesser.policy = artifact['policy']
+        guesser.index_classes()
+        
+        if guesser.question_strategy == 'policy' and guesser.policy is None:
+            guesser.build_policy()
+        return guesser
+    
+    def freeze(self):
+        """
+        Turn this guesser into a read-only snapshot. The served instance is
+        shared by every request and thread until a reload swaps in another one.
+        """
+        self.feature_names = tuple(self.feature_names)
+        self.feature_index = MappingProxyType(dict(self.feature_index))
+        self.yes_bits = tuple(self.yes_bits)
+        self.no_bits = tuple(self.no_bits)
+        if self.policy is not None:
+            self.policy = MappingProxyType(self.policy)
+        for array in (self.X, self.celebrities, self.row_class, *(self.policy or {}).values()):
+            if array is not None:
+                array.setflags(write=False)
+        object.__setattr__(self, '_frozen', True)
+        return self
+    
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Guessify snapshot is read-only, can't set '{name}'")
+        super().__setattr__(name, value)
+    
+    @property
+    def n_celebrities(self):
+        """Number of celebrities in the catalogue"""
+        return 0 if self.celebrities is None else len(self.celebrities)
+    
+    def narrow(self, mask, feature, answer):
+        """Narrow a candidate bitset with a single answer"""
+        i = self.feature_index.get(feature)
+        if i is None:
+            return mask
+        if answer == 'yes':
+            return mask & self.yes_bits[i]
+        if answer == 'no':
+            return mask & self.no_bits[i]
+        # 'unknown', 'probably', 'probably_not' don't filter strictly
+        return mask
+    
+    def candidate_mask(self, answers):
+        """
+        Bitset of celebrities matching every clear yes/no answer
+        answers: dict with feature names as keys and yes/no as values
+        """
+        with timer('filter'):
+            mask = self.all_bits
+            for feature, answer in answers.items():
+                mask = self.narrow(mask, feature, answer)
+        return mask
+    
+    def count_candidates(self, mask):
+        """Number of celebrities in a candidate bitset"""
+        return mask.bit_count()
+    
+    def candidate_indices(self, mask):
+        """Row indices of the celebrities in a candidate bitset"""
+        n = self.n_celebrities
+        raw = np.frombuffer(mask.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, count=n, bitorder='little'))
+    
+    def candidate_names(self, mask):
+        """Names of the celebrities in a candidate bitset"""
+        return self.celebrities[self.candidate_indices(mask)].tolist()
+    
     def train_model(self):
         """Train the decision tree classifier on full dataset (no split for small data)"""
-        # Features (X) and target (y)
-        X = self.data[self.feature_names]
-        y = self.data['name']
+        # Features (X) and target (y); plain arrays so predictions skip feature-name checks
+        X = self.X
+        y = self.celebrities
         
-        print(f"\n{'='*80}")
-        print(f"Training on FULL dataset: {len(X)} celebrities")
-        print(f"{'='*80}")
+        logger.info("Training on the full dataset: %d celebrities", len(X))
         
         # Create and train the decision tree on ALL data
         
@@ -69,32 +234,104 @@ class Guessify:
         train_predictions = self.model.predict(X)
         train_accuracy = accuracy_score(y, train_predictions)
         
-        print(f"\n✅ Model Training Accuracy: {train_accuracy * 100:.2f}%")
+        logger.info("Model training accuracy: %.2f%%", train_accuracy * 100)
         
         if train_accuracy < 1.0:
-            print("⚠️  Warning: Model couldn't learn all celebrities perfectly!")
-            print(f"   Current accuracy: {train_accuracy * 100:.2f}%")
-            
             # Find which celebrities are being confused
-            misclassified = []
-            for i, (true, pred) in enumerate(zip(y, train_predictions)):
-                if true != pred:
-                    misclassified.append((true, pred))
-            
-            if misclassified:
-                print(f"\n   Misclassified celebrities ({len(misclassified)}):")
-                for true_name, pred_name in misclassified:
-                    print(f"   - {true_name} → predicted as {pred_name}")
-            
-            print("\n   💡 This might happen if two celebrities have identical features.")
-            print("   Consider adding more distinctive features to differentiate them.")
-        else:
-            print("🎉 Perfect! Model learned all celebrities!")
+            misclassified = [(true, pred) for true, pred in zip(y, train_predictions) if true != pred]
+            # This might happen if two celebrities have identical features;
+            # more distinctive features would tell them apart
+            logger.warning("Model couldn't learn all celebrities: %d misclassified (%s)",
+                           len(misclassified),
+                           ', '.join(f'{true} -> {pred}' for true, pred in misclassified))
         
-        print(f"{'='*80}\n")
+        self.index_classes()
+        if self.question_strategy == 'policy':
+            self.build_policy()
         
         return self.model
     
+    def index_classes(self):
+        """Map every catalogue row to its column in predict_proba's output"""
+        self.row_class = np.searchsorted(self.model.classes_, self.celebrities).astype(np.intp)
+        self.row_class.setflags(write=False)
+        return self.row_class
+    
+    def build_policy(self):
+        """
+        Precompute the question policy for the whole answer space.
+        
+        Every node asks the feature with the highest split entropy over the
+        celebrities that reach it; 'yes'/'no' lead to the child nodes. Leaves
+        hold one celebrity, or several that no feature can tell apart.
+        Stored as flat arrays like sklearn's tree_: feature is -1 at leaves.
+        """
+        features, yes_child, no_child, counts = [], [], [], []
+        stack = [(self._new_policy_node(features, yes_child, no_child, counts),
+                  np.arange(self.n_celebrities))]
+        
+        while stack:
+            node, rows = stack.pop()
+            counts[node] = len(rows)
+            if len(rows) <= 1:
+                continue
+            
+            p = self.X[rows].sum(axis=0, dtype=np.int64) / len(rows)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                entropy = np.nan_to_num(-(p * np.log2(p) + (1 - p) * np.log2(1 - p)), nan=0.0)
+            best = int(entropy.argmax())
+            if entropy[best] <= 0:
+                continue
+            
+            split = self.X[rows, best] == 1
+            features[node] = best
+            yes_child[node] = self._new_policy_node(features, yes_child, no_child, counts)
+            no_child[node] = self._new_policy_node(features, yes_child, no_child, counts)
+            stack.append((yes_child[node], rows[split]))
+            stack.append((no_child[node], rows[~split]))
+        
+        self.policy = {
+            'feature': np.array(features, dtype=np.int32),
+            'yes': np.array(yes_child, dtype=np.int32),
+            'no': np.array(no_child, dtype=np.int32),
+            'count': np.array(counts, dtype=np.int32),
+        }
+        for array in self.policy.values():
+            array.setflags(write=False)
+        return self.policy
+    
+    @staticmethod
+    def _new_policy_node(features, yes_child, no_child, counts):
+        features.append(OFF_POLICY)
+        yes_child.append(OFF_POLICY)
+        no_child.append(OFF_POLICY)
+        counts.append(0)
+        return len(features) - 1
+    
+    def policy_root(self):
+        """Root node of the policy, or OFF_POLICY when no policy is in use"""
+        return 0 if self.policy is not None else OFF_POLICY
+    
+    def policy_question(self, node):
+        """Feature asked at a policy node (None at a leaf)"""
+        i = int(self.policy['feature'][node])
+        return None if i == OFF_POLICY else self.feature_names[i]
+    
+    def policy_step(self, node, feature, answer):
+        """
+        Follow one answer down the policy. Returns OFF_POLICY when the answer
+        leaves the tree: another feature was answered, or it wasn't yes/no.
+        """
+        if node == OFF_POLICY or self.policy is None:
+            return OFF_POLICY
+        if self.policy_question(node) != feature:
+            return OFF_POLICY
+        if answer == 'yes':
+            return int(self.policy['yes'][node])
+        if answer == 'no':
+            return int(self.policy['no'][node])
+        return OFF_POLICY
+    
     def get_feature_importance(self):
         """Get the most important features for asking questions"""
         if self.model is None:
@@ -116,33 +353,122 @@ class Guessify:
         if self.model is None:
             return None
         
-        # Create a feature vector from answers
-        feature_vector = []
-        for feature in self.feature_names:
-            if feature in answers:
-                feature_vector.append(1 if answers[feature] == 'yes' else 0)
-            else:
-                feature_vector.append(0)  # Default to 'no' if not answered
-        
-        # Reshape for prediction
-        feature_vector = np.array(feature_vector).reshape(1, -1)
-        
-        # Get prediction
-        prediction = self.model.predict(feature_vector)[0]
+        # Create a feature vector from answers (unanswered defaults to 'no')
+        feature_vector = self.encode_answers([answers])
         
-        # Get probability
-        probabilities = self.model.predict_proba(feature_vector)[0]
-        max_prob = max(probabilities)
+        # Get prediction and its probability
+        with timer('predict'):
+            probabilities = self.model.predict_proba(feature_vector)[0]
+        best = int(probabilities.argmax())
         
         return {
-            'name': prediction,
-            'confidence': max_prob
+            'name': str(self.model.classes_[best]),
+            'confidence': float(probabilities[best])
         }
     
-    def get_next_question(self, answered_features):
-        """Get the next best feature to ask about with improved selection"""
-        import random
+    def encode_answers(self, answer_sets):
+        """
+        Turn answer dicts into an (N, n_features) 0/1 matrix, the same
+        encoding as predict(): 'yes' is 1, anything else or unanswered is 0
+        """
+        answer_sets = list(answer_sets)
+        matrix = np.zeros((len(answer_sets), len(self.feature_names)), dtype=np.uint8)
+        for row, answers in enumerate(answer_sets):
+            columns = [self.feature_index[f] for f, a in answers.items()
+                       if a == 'yes' and f in self.feature_index]
+            matrix[row, columns] = 1
+        return matrix
+    
+    def predict_batch(self, answer_sets, batch_size=10000, filtered=False):
+        """
+        Predict many answer sets in one vectorised pass per batch
+        answer_sets: (N, n_features) 0/1 array, or any iterable of answer
+        dicts (consumed batch_size at a time, so it can be a stream)
+        filtered: like predict_with_filtering(), only pick among celebrities
+        matching every answer (needs answer dicts)
+        Returns (names, confidences) arrays of length N
+        """
+        if self.model is None:
+            return None
+        
+        if isinstance(answer_sets, np.ndarray):
+            if filtered:
+                raise ValueError("Filtered batch predictions need answer dicts")
+            batches = [(answer_sets, None)]
+        else:
+            stream = iter(answer_sets)
+            chunks = iter(lambda: list(islice(stream, batch_size)), [])
+            batches = ((self.encode_answers(chunk), chunk) for chunk in chunks)
+        
+        names, confidences = [], []
+        for X, chunk in batches:
+            probabilities = self.model.predict_proba(X)
+            best = probabilities.argmax(axis=1)
+            name = np.asarray(self.model.classes_[best], dtype=self.celebrities.dtype)
+            confidence = probabilities[np.arange(len(best)), best]
+            
+            if filtered:
+                for i, answers in enumerate(chunk):
+                    candidates = self.candidate_indices(self.candidate_mask(answers))
+                    if len(candidates) == 1:
+                        name[i], confidence[i] = self.celebrities[candidates[0]], 1.0
+                    elif len(candidates) > 1:
+                        candidate_probs = probabilities[i, self.row_class[candidates]]
+                        pick = candidate_probs.argmax()
+                        name[i], confidence[i] = self.celebrities[candidates[pick]], candidate_probs[pick]
+            
+            names.append(name)
+            confidences.append(confidence)
+        
+        if not names:
+            return np.array([], dtype=str), np.array([], dtype=float)
+        return np.concatenate(names), np.concatenate(confidences)
+    
+    def get_next_question(self, answered_features, candidates=None, node=OFF_POLICY):
+        """
+        Get the next best feature to ask about
+        candidates: bitset of the remaining celebrities, used by the
+        'information_gain' and 'policy' strategies
+        node: current policy node; off the policy we fall back to information gain
+        """
+        with timer('question'):
+            if self.question_strategy == 'policy' and node != OFF_POLICY and self.policy is not None:
+                return self.policy_question(node)
+            if self.question_strategy in ('information_gain', 'policy') and candidates:
+                return self.get_most_informative_question(answered_features, candidates)
+            return self.get_important_question(answered_features)
+    
+    def get_most_informative_question(self, answered_features, candidates):
+        """
+        Pick the unanswered feature whose yes/no split of the remaining
+        candidates has the highest entropy (ties broken at random).
+        Returns None when no feature can split the candidates any further.
+        """
+        rows = self.candidate_indices(candidates)
+        n = len(rows)
+        if n == 0:
+            return self.get_important_question(answered_features)
+        
+        # Share of remaining candidates answering 'yes' to every feature
+        p = self.X[rows].sum(axis=0, dtype=np.int64) / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropy = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+        entropy = np.nan_to_num(entropy, nan=0.0)
+        
+        for feature in answered_features:
+            i = self.feature_index.get(feature)
+            if i is not None:
+                entropy[i] = -1.0
+        
+        best = entropy.max()
+        if best <= 0:
+            return None
         
+        best_features = np.flatnonzero(entropy >= best - 1e-9)
+        return self.feature_names[random.choice(best_features.tolist())]
+    
+    def get_important_question(self, answered_features):
+        """Get the next feature to ask about from the global feature importances"""
         # Get unanswered features
         unanswered = [f for f in self.feature_names if f not in answered_features]
         
@@ -172,66 +498,40 @@ class Guessify:
         # Fallback: random selection from all unanswered
         return random.choice(unanswered)
     
-    def predict_with_filtering(self, answers):
+    def predict_with_filtering(self, answers, mask=None):
         """
         Predict celebrity based on answers with strict filtering
+        mask: candidate bitset for these answers, if the caller already has it
+        Returns name, confidence and the number of celebrities matching every
+        answer ('matches'); with no match it falls back to predict()
         """
         if self.model is None:
             return None
         
-        # First, filter the dataset based on exact answers
-        filtered_data = self.data.copy()
-        
-        for feature, answer in answers.items():
-            if feature in self.feature_names:
-                if answer == 'yes':
-                    filtered_data = filtered_data[filtered_data[feature] == 1]
-                elif answer == 'no':
-                    filtered_data = filtered_data[filtered_data[feature] == 0]
-                # 'unknown', 'probably', 'probably_not' don't filter strictly
-        
-        # If we have exact matches, return the best one
-        if len(filtered_data) > 0:
-            # If only one match, return it with high confidence
-            if len(filtered_data) == 1:
-                return {
-                    'name': filtered_data.iloc[0]['name'],
-                    'confidence': 1.0
-                }
-            
-            # Multiple matches - use the model to pick the best one
-            # Create feature vector
-            feature_vector = []
-            for feature in self.feature_names:
-                if feature in answers:
-                    feature_vector.append(1 if answers[feature] == 'yes' else 0)
-                else:
-                    feature_vector.append(0)
-            
-            feature_vector = np.array(feature_vector).reshape(1, -1)
-            
-            # Get probabilities for all celebrities
-            probabilities = self.model.predict_proba(feature_vector)[0]
-            classes = self.model.classes_
-            
-            # Find the best match among filtered celebrities
-            best_match = None
-            best_prob = 0
-            
-            for idx, celebrity in enumerate(classes):
-                if celebrity in filtered_data['name'].values:
-                    if probabilities[idx] > best_prob:
-                        best_prob = probabilities[idx]
-                        best_match = celebrity
-            
-            if best_match:
-                return {
-                    'name': best_match,
-                    'confidence': best_prob
-                }
-        
-        # Fallback: use regular prediction if no filtered matches
-        return self.predict(answers)
+        # First, filter the candidates based on exact answers
+        if mask is None:
+            mask = self.candidate_mask(answers)
+        rows = self.candidate_indices(mask)
+        
+        if len(rows) == 0:
+            # Fallback: use regular prediction if no filtered matches
+            return {**self.predict(answers), 'matches': 0}
+        
+        # If only one match, return it with high confidence
+        if len(rows) == 1:
+            return {'name': str(self.celebrities[rows[0]]), 'confidence': 1.0, 'matches': 1}
+        
+        # Multiple matches - masked argmax of the model's probabilities over them
+        with timer('predict'):
+            probabilities = self.model.predict_proba(self.encode_answers([answers]))[0]
+        candidate_probs = probabilities[self.row_class[rows]]
+        best = int(candidate_probs.argmax())
+        return {
+            'name': str(self.celebrities[rows[best]]),
+            'confidence': float(candidate_probs[best]),
+            'matches': len(rows),
+        }
+    
     def format_feature_question(self, feature):
         """Convert feature name to a readable question"""
         # Replace underscores with spaces and capitalize
@@ -0,0 +1,234 @@
+"""
+Incremental per-game candidate state.
+
+Each GameSession carries the answered/yes feature bitsets, the question
+count and the last question asked, so a request only applies the newest
+answer instead of replaying every Answer row. The surviving candidate bitset
+(one bit per celebrity, i.e. large for big catalogues) is not stored: it is
+derived from the answered/yes bitsets when the game is loaded and kept on the
+in-memory GameSession as `candidates`.
+
+The answered/yes bitsets plus the order the features were asked in are also
+the compact record of the game's answers, written in the same UPDATE; Answer
+rows are optional (GUESSER_ANSWER_ROWS) and answer_history() reads either.
+Feature indices are only meaningful for the catalogue the game was played on
+(model_version), so they are always decoded with that catalogue's feature
+names; a game whose catalogue is unknown is not replayed onto another one.
+"""
+import logging
+
+from .decision_tree import OFF_POLICY
+from .utils import get_feature_names, get_guesser
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = ['asked_mask', 'yes_mask', 'answer_order', 'question_count',
+                'last_feature', 'policy_node', 'model_version']
+
+# Hex digits per feature index in answer_order
+ORDER_DIGITS = 4
+
+
+def encode_mask(mask):
+    """Encode a bitset as a hex string for storage"""
+    return format(mask, 'x')
+
+
+def decode_mask(value):
+    """Decode a stored hex string back into a bitset"""
+    return int(value, 16) if value else 0
+
+
+def encode_order(indices):
+    """Pack feature indices, in the order they were asked, into a hex string"""
+    return ''.join(format(i, f'0{ORDER_DIGITS}x') for i in indices)
+
+
+def decode_order(value):
+    """Unpack the feature indices stored by encode_order"""
+    return [int(value[i:i + ORDER_DIGITS], 16) for i in range(0, len(value or ''), ORDER_DIGITS)]
+
+
+def is_stateless(game_session):
+    """Whether the game lives in a signed token rather than the database (see game_tokens.py)"""
+    return getattr(game_session, 'stateless', False)
+
+
+def _save(game_session, fields):
+    # Stateless games are only saved once completed
+    if not is_stateless(game_session):
+        game_session.save(update_fields=fields)
+
+
+def has_state(game_session):
+    """Whether the session already carries an initialised state"""
+    return bool(game_session.asked_mask)
+
+
+def init_state(game_session, guesser):
+    """Reset the state to a fresh game (not saved)"""
+    game_session.candidates = guesser.all_bits
+    game_session.asked_mask = encode_mask(0)
+    game_session.yes_mask = encode_mask(0)
+    game_session.answer_order = ''
+    game_session.question_count = 0
+    game_session.last_feature = None
+    game_session.policy_node = guesser.policy_root()
+    game_session.model_version = guesser.data_hash or ''
+
+
+def get_game_guesser(game_session):
+    """
+    The guesser snapshot this game started on. If that catalogue is no longer
+    available after a hot reload, the game is replayed onto the current one.
+    """
+    guesser = get_guesser(game_session.model_version or None)
+    ensure_state(game_session, guesser)
+    return guesser
+
+
+def ensure_state(game_session, guesser):
+    """
+    Make sure the session has a state and its candidates: derived from the
+    answered/yes bitsets, or rebuilt once by replaying the answers for games
+    started before the state existed, or moved to another catalogue by a hot
+    reload
+    """
+    if getattr(game_session, 'candidates', None) is not None:
+        return game_session
+    if has_state(game_session) and game_session.model_version == (guesser.data_hash or ''):
+        game_session.candidates = guesser.candidate_mask(answers_dict(game_session, guesser))
+        return game_session
+
+    # Answer rows name their features, so prefer them when the game has any
+    answers = [(a.feature, a.answer) for a in game_session.answers.all()] if game_session.pk else []
+    if not answers:
+        answers = stored_answers(game_session, guesser)
+    question_count = game_session.question_count
+    version = game_session.model_version
+    init_state(game_session, guesser)
+    if answers is None:
+        # Guessing which features the stored indices meant would make the game
+        # go on with answers the player never gave
+        logger.warning("Game %s can't be replayed: the feature names of catalogue %s are unknown",
+                       game_session.session_key, version[:16] or '(none)')
+        if game_session.is_completed:
+            # Leave the finished record alone; only this in-memory copy is reset
+            game_session.question_count = question_count
+            return game_session
+        answers = []
+    for feature, answer in answers:
+        _apply(game_session, guesser, feature, answer)
+    _save(game_session, STATE_FIELDS + ['updated_at'])
+    return game_session
+
+
+def _apply(game_session, guesser, feature, answer, certain=True):
+    """Apply one answer to the in-memory state; returns False if ignored"""
+    i = guesser.feature_index.get(feature)
+    if i is None:
+        return False
+
+    bit = 1 << i
+    asked = decode_mask(game_session.asked_mask)
+    if asked & bit:
+        # Already answered (e.g. a double-submitted form)
+        return False
+
+    game_session.asked_mask = encode_mask(asked | bit)
+    game_session.answer_order += encode_order([i])
+    if answer == 'yes':
+        game_session.yes_mask = encode_mask(decode_mask(game_session.yes_mask) | bit)
+    mask = guesser.narrow(game_session.candidates, feature, answer)
+    game_session.candidates = mask
+    game_session.question_count += 1
+
+    # Walk the question policy; uncertain answers and contradictions leave it
+    if certain and mask:
+        game_session.policy_node = guesser.policy_step(game_session.policy_node, feature, answer)
+    else:
+        game_session.policy_node = OFF_POLICY
+    return True
+
+
+def apply_answer(game_session, guesser, feature, answer, certain=True):
+    """
+    Apply the newest answer and persist the state; returns False if ignored
+    certain: False for answers like 'unknown' that shouldn't steer the policy
+    """
+    ensure_state(game_session, guesser)
+    if not _apply(game_session, guesser, feature, answer, certain):
+        return False
+    _save(game_session, STATE_FIELDS + ['updated_at'])
+    return True
+
+
+def set_last_feature(game_session, feature):
+    """Remember the question currently put to the player"""
+    game_session.last_feature = feature
+    _save(game_session, ['last_feature', 'updated_at'])
+
+
+def remaining_mask(game_session):
+    """Bitset of the celebrities still matching every answer (after ensure_state())"""
+    return game_session.candidates
+
+
+def answered_features(game_session, guesser):
+    """Set of features the player has already answered"""
+    asked = decode_mask(game_session.asked_mask)
+    return {f for i, f in enumerate(guesser.feature_names) if asked >> i & 1}
+
+
+def feature_names_for(game_session, guesser):
+    """
+    Feature names the game's stored indices refer to: those of the catalogue
+    it was played on, or None if that catalogue is unknown
+    """
+    version = game_session.model_version
+    if version and version == guesser.data_hash:
+        return guesser.feature_names
+    return get_feature_names(version)
+
+
+def stored_answers(game_session, guesser):
+    """
+    The [(feature, 'yes'/'no')] answers from the compact encoding, in the
+    order they were given (feature order for games that predate it); None
+    if the game's catalogue, and so what its indices mean, is unknown
+    """
+    names = feature_names_for(game_session, guesser)
+    if names is None:
+        return None
+    asked = decode_mask(game_session.asked_mask)
+    yes = decode_mask(game_session.yes_mask)
+    order = decode_order(game_session.answer_order)
+    order += [i for i in range(asked.bit_length()) if asked >> i & 1 and i not in order]
+    return [(names[i], 'yes' if yes >> i & 1 else 'no') for i in order if i < len(names)]
+
+
+def answer_history(game_session, guesser):
+    """
+    The game's answers as [{'id', 'feature', 'answer', 'created_at'}] from its
+    Answer rows, or rebuilt from the compact encoding when it has none (no
+    ids or timestamps then); None if they can't be read (see stored_answers)
+    """
+    rows = list(game_session.answers.order_by('created_at').values('id', 'feature', 'answer', 'created_at'))
+    if rows:
+        return rows
+    answers = stored_answers(game_session, guesser)
+    if answers is None:
+        return None
+    return [{'id': None, 'feature': feature, 'answer': answer, 'created_at': None}
+            for feature, answer in answers]
+
+
+def answers_dict(game_session, guesser):
+    """Rebuild the {feature: 'yes'/'no'} answers from the stored bitsets"""
+    asked = decode_mask(game_session.asked_mask)
+    yes = decode_mask(game_session.yes_mask)
+    return {
+        f: 'yes' if yes >> i & 1 else 'no'
+        for i, f in enumerate(guesser.feature_names)
+        if asked >> i & 1
+    }
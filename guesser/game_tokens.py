@@ -0,0 +1,88 @@
+"""
+Stateless games: the in-progress state travels in a signed token.
+
+With GUESSER_STATELESS_GAMES on, API games are not saved while they are being
+played. Their state (answered/yes bitsets, question order and count, policy
+node, pending question) is packed into a compact token signed with
+SECRET_KEY, and every answer returns a new token. The GameSession row is only
+written when the game is completed, so any node can serve any question
+without touching the database.
+
+A decoded game is an unsaved GameSession flagged `stateless`; the game state
+and gameplay helpers skip their per-answer saves for it.
+"""
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+from . import game_state
+from .models import GameSession
+from .utils import get_guesser
+
+STATE_SALT = 'guesser.game_tokens'
+
+
+def is_enabled():
+    return getattr(settings, 'GUESSER_STATELESS_GAMES', False)
+
+
+def get_max_age():
+    """Seconds a state token stays valid"""
+    return getattr(settings, 'GUESSER_GAME_TOKEN_MAX_AGE', 24 * 3600)
+
+
+def new_game(user, guesser):
+    """A fresh, unsaved game"""
+    game_session = GameSession(session_key=str(uuid.uuid4()))
+    if user is not None and user.is_authenticated:
+        game_session.user = user
+    game_session.stateless = True
+    game_state.init_state(game_session, guesser)
+    return game_session
+
+
+def dumps(game_session, guesser):
+    """Token carrying the state of an unsaved game"""
+    feature = guesser.feature_index.get(game_session.last_feature, -1)
+    state = {
+        'k': game_session.session_key,
+        'u': game_session.user_id,
+        'v': game_session.model_version,
+        'a': game_session.asked_mask,
+        'y': game_session.yes_mask,
+        'o': game_session.answer_order,
+        'n': game_session.question_count,
+        'p': game_session.policy_node,
+        'f': feature,
+    }
+    return signing.dumps(state, salt=STATE_SALT, compress=True)
+
+
+def loads(token):
+    """
+    The unsaved game a token describes (get_game_guesser() derives its
+    candidates); None if the token is forged, malformed or expired
+    """
+    try:
+        state = signing.loads(token, salt=STATE_SALT, max_age=get_max_age())
+        game_session = GameSession(
+            session_key=state['k'],
+            user_id=state['u'],
+            model_version=state['v'],
+            asked_mask=state['a'],
+            yes_mask=state['y'],
+            answer_order=state['o'],
+            question_count=state['n'],
+            policy_node=state['p'],
+        )
+        feature = state['f']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+    game_session.stateless = True
+
+    guesser = get_guesser(game_session.model_version or None)
+    names = game_state.feature_names_for(game_session, guesser)
+    if names is not None and 0 <= feature < len(names):
+        game_session.last_feature = names[feature]
+    return game_session
@@ -0,0 +1,63 @@
+"""
+Structured, sampled traces of individual games.
+
+Trace events go to the `guesser.trace` logger, one record per event, with the
+game's session key and the event fields attached to the record (`game`,
+`event`, `fields`) for structured formatters such as logs.JsonFormatter.
+
+INFO events (e.g. the final guess) are logged for every game. DEBUG events,
+the verbose walkthrough, only for sampled games:
+
+    GUESSER_TRACE_SAMPLE_RATE   share of games traced in full (0.0 - 1.0)
+    GUESSER_TRACE_USERS         usernames whose games are always traced in full
+
+Sampling hashes the session key, so a game is traced in full or not at all,
+on every request and every worker. The logger is configured at DEBUG so
+these settings decide; raising its level (GUESSER_TRACE_LEVEL) overrides them.
+"""
+import logging
+import zlib
+
+from django.conf import settings
+
+logger = logging.getLogger('guesser.trace')
+
+
+class _Fields(dict):
+    # Rendered as key=value pairs only when the record is formatted
+    def __str__(self):
+        return ' '.join(f'{key}={value!r}' for key, value in self.items())
+
+
+def get_sample_rate():
+    return getattr(settings, 'GUESSER_TRACE_SAMPLE_RATE', 0.0)
+
+
+def get_traced_users():
+    return getattr(settings, 'GUESSER_TRACE_USERS', [])
+
+
+def is_sampled(game_session):
+    """Whether the game's DEBUG events are logged"""
+    rate = get_sample_rate()
+    if rate > 0 and zlib.crc32(game_session.session_key.encode()) % 10000 < rate * 10000:
+        return True
+    users = get_traced_users()
+    return bool(users and game_session.user_id) and game_session.user.username in users
+
+
+def is_enabled(game_session, level=logging.DEBUG):
+    """Whether trace events of `level` are logged for the game; check before building costly fields"""
+    if not logger.isEnabledFor(level):
+        return False
+    return level >= logging.INFO or is_sampled(game_session)
+
+
+def trace(game_session, event, level=logging.DEBUG, **fields):
+    """Log a trace event of the game with its fields"""
+    if not is_enabled(game_session, level):
+        return
+    # Formatting is left to the handler (off the request thread with QueueStreamHandler)
+    fields = _Fields(fields)
+    logger.log(level, '%s game=%s %s', event, game_session.session_key, fields,
+               extra={'game': game_session.session_key, 'event': event, 'fields': fields})
@@ -0,0 +1,204 @@
+"""
+Game flow shared by the page views and the JSON endpoints (including the
+versioned API in guesser/api.py).
+
+record_answer() applies one answer to a game; next_step() decides whether to
+ask another question or make the final guess and returns what the player sees
+next, so answering and advancing can happen in a single request.
+"""
+import logging
+import uuid
+
+from django.db import transaction
+
+from . import game_state, game_trace, stats
+from .models import Answer, GameSession
+from .utils import store_answer_rows
+
+MIN_QUESTIONS = 5
+MAX_QUESTIONS = 10
+
+# Answer buttons -> (stored answer, whether it should steer the question policy)
+ANSWERS = {
+    'yes': ('yes', True),
+    'no': ('no', True),
+    'probably': ('yes', True),
+    'probably_not': ('no', True),
+    'unknown': ('no', False),  # Treat unknown as no for filtering
+}
+
+
+def start_game(user, guesser):
+    """Create and save a new game for `user` (None for anonymous players)"""
+    if user is not None and user.is_authenticated:
+        # For logged-in users, include user ID in session key
+        game_session = GameSession(session_key=f"user_{user.id}_{uuid.uuid4()}", user=user)
+    else:
+        game_session = GameSession(session_key=str(uuid.uuid4()))
+
+    # Start from the full candidate set
+    game_state.init_state(game_session, guesser)
+    with transaction.atomic():
+        game_session.save()
+        stats.record_started(game_session)
+    return game_session
+
+
+def record_answer(game_session, guesser, feature, answer):
+    """
+    Apply the player's answer to the game state and log it; returns False if
+    the answer is not one of ANSWERS or the question was already answered
+    """
+    if answer not in ANSWERS:
+        return False
+    final_answer, certain = ANSWERS[answer]
+
+    # Apply only the new answer to the game state (which also records it
+    # compactly), then log it as an Answer row unless that is turned off
+    if not game_state.apply_answer(game_session, guesser, feature, final_answer, certain=certain):
+        return False
+    # Stateless games have no row to attach Answer rows to; their compact answers are saved at the end
+    if store_answer_rows() and not game_state.is_stateless(game_session):
+        Answer.objects.create(
+            game_session=game_session,
+            feature=feature,
+            answer=final_answer
+        )
+    return True
+
+
+def should_guess(question_count, next_feature, remaining_celebrities):
+    """Decision logic for when to guess"""
+    if question_count >= MAX_QUESTIONS:
+        # Always guess at maximum questions
+        return True
+    if question_count >= MIN_QUESTIONS:
+        # After minimum questions, guess if:
+        # 1. No more questions available, OR
+        # 2. Exactly 1 celebrity matches
+        return next_feature is None or remaining_celebrities == 1
+    # If we narrowed down to exactly 1, guess immediately (even before min questions);
+    # if no question is available before the minimum, force a guess
+    return remaining_celebrities == 1 or next_feature is None
+
+
+def progress_percentage(guesser, remaining_celebrities, question_count):
+    """Progress based on how many celebrities were ruled out"""
+    total_celebrities = guesser.n_celebrities
+    narrowed_down = total_celebrities - remaining_celebrities
+    progress = (narrowed_down / total_celebrities) * 100
+
+    # Ensure progress is at least visible after first question
+    if question_count > 0 and progress < 5:
+        progress = 5
+
+    # Cap at 95% until final guess
+    return min(progress, 95)
+
+
+def next_step(game_session, guesser):
+    """
+    Pick the next question, or make the final guess when it is time.
+
+    Returns {'done': True, 'guessed_celebrity': ...} once the game is
+    completed, otherwise {'done': False} plus the question to ask (the
+    play_game template context).
+    """
+    # Read the incremental state instead of replaying every answer
+    answered_features = game_state.answered_features(game_session, guesser)
+    mask = game_state.remaining_mask(game_session)
+    remaining_celebrities = guesser.count_candidates(mask)
+    question_count = game_session.question_count
+
+    # Get next question (keep the pending one if the page is reloaded)
+    if game_session.last_feature and game_session.last_feature not in answered_features:
+        next_feature = game_session.last_feature
+    else:
+        next_feature = guesser.get_next_question(
+            answered_features, candidates=mask, node=game_session.policy_node
+        )
+
+    if should_guess(question_count, next_feature, remaining_celebrities):
+        make_guess(game_session, guesser, mask)
+        return {'done': True, 'guessed_celebrity': game_session.guessed_celebrity}
+
+    if next_feature != game_session.last_feature:
+        game_state.set_last_feature(game_session, next_feature)
+
+    return {
+        'done': False,
+        'question': guesser.format_feature_question(next_feature),
+        'feature': next_feature,
+        'question_number': question_count + 1,
+        'total_questions': MAX_QUESTIONS,
+        'remaining_celebrities': remaining_celebrities,
+        'progress_percentage': progress_percentage(guesser, remaining_celebrities, question_count),
+    }
+
+
+def make_guess(game_session, guesser, mask):
+    """Make the final prediction and complete the game"""
+    answers_dict = game_state.answers_dict(game_session, guesser)
+    if game_trace.is_enabled(game_session):
+        for feature, answer in answers_dict.items():
+            game_trace.trace(game_session, 'guess.answer',
+                             question=guesser.format_feature_question(feature), answer=answer)
+        game_trace.trace(game_session, 'guess.candidates', names=guesser.candidate_names(mask))
+
+    # STRICT FILTERING: the state mask only holds celebrities that match ALL answers;
+    # the engine picks the most likely of them
+    prediction = guesser.predict_with_filtering(answers_dict, mask=mask)
+
+    if prediction['matches'] >= 1:
+        guessed_name = prediction['name']
+    else:
+        # NO MATCHES FOUND: none of our celebrities match ALL the answers
+        guessed_name = "No celebrity matches your answers"
+    game_trace.trace(game_session, 'guess.made', level=logging.INFO,
+                     guess=guessed_name, matches=prediction['matches'],
+                     confidence=round(prediction['confidence'] * 100, 2),
+                     questions=game_session.question_count)
+
+    # Save prediction; a stateless game is written for the first time here
+    game_session.guessed_celebrity = guessed_name
+    game_session.is_completed = True
+    with transaction.atomic():
+        if game_state.is_stateless(game_session):
+            game_session.save(force_insert=True)
+            game_session.stateless = False
+            stats.record_started(game_session)
+        else:
+            # Concurrent requests for the same game may all get here: only the
+            # one that flips is_completed completes it and counts it
+            claimed = GameSession.objects.filter(pk=game_session.pk, is_completed=False) \
+                .update(is_completed=True, guessed_celebrity=guessed_name)
+            if not claimed:
+                return
+            game_session.save()
+        stats.record_completed(game_session)
+    stats.invalidate(game_session.user)
+
+
+def result(game_session, guesser):
+    """The final guess with its confidence (the result template context)"""
+    answers_dict = game_state.answers_dict(game_session, guesser)
+    mask = game_state.remaining_mask(game_session)
+    prediction = guesser.predict_with_filtering(answers_dict, mask=mask)
+
+    return {
+        'guessed_celebrity': game_session.guessed_celebrity,
+        'is_correct': game_session.is_correct,
+        'confidence': prediction['confidence'] * 100,  # Convert to percentage
+        'questions_asked': game_session.question_count,
+        'remaining_celebrities': prediction['matches'],
+    }
+
+
+def confirm(game_session, is_correct):
+    """The player confirms (or corrects) the guess"""
+    was_correct = game_session.is_correct
+    game_session.is_correct = is_correct
+    with transaction.atomic():
+        game_session.save()
+        stats.record_confirmed(game_session, was_correct)
+    stats.invalidate(game_session.user)
@@ -0,0 +1,66 @@
+"""
+Django side of the latency metrics (guesser/metrics.py).
+
+LatencyMiddleware times every request by view, with the DB queries as the
+'db' stage, and adds a Server-Timing header if GUESSER_SERVER_TIMING is on
+(by default only with DEBUG). TimedDjangoTemplates is the DjangoTemplates
+backend with template renders timed as the 'render' stage.
+The engine stages ('filter', 'question', 'predict') are timed in Guessify.
+"""
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+
+def server_timing_enabled():
+    return getattr(settings, 'GUESSER_SERVER_TIMING', settings.DEBUG)
+
+
+def _time_query(execute, sql, params, many, context):
+    with metrics.timer('db'):
+        return execute(sql, params, many, context)
+
+
+class LatencyMiddleware:
+    """Per-view and per-stage request latency; goes first in MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with metrics.collect() as timings, connection.execute_wrapper(_time_query):
+            response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        metrics.record(match.view_name if match else 'unmatched', seconds, timings)
+        if server_timing_enabled():
+            response['Server-Timing'] = metrics.server_timing(timings, seconds)
+        return response
+
+
+class TimedTemplate:
+    """A backend template whose render() is timed"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with metrics.timer('render'):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -0,0 +1,76 @@
+"""
+Logging plumbing used by settings.LOGGING.
+
+QueueStreamHandler keeps log I/O off the request path: emitting a record only
+puts it on an in-memory queue, and a QueueListener thread formats it and
+writes it to the stream. JsonFormatter writes one JSON object per record,
+including the structured fields of game traces (see game_trace.py).
+
+This module is imported while settings are configured, so it must not import
+any Django app code.
+"""
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueStreamHandler(QueueHandler):
+    """StreamHandler whose writes happen on a background thread"""
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = None
+        self._pid = None
+
+    def _ensure_listener(self):
+        # The listener thread doesn't survive a fork (gunicorn --preload configures
+        # logging in the master), so each process starts its own
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid != os.getpid():
+                self.queue = queue.SimpleQueue()
+                self.listener = QueueListener(self.queue, self.target)
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        # Records are formatted by the target, on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # The queue stays in this process, so the record needn't be flattened
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        # Drain the queue before the process exits (logging.shutdown closes handlers)
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
+        self.target.close()
+        super().close()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key in ('game', 'event', 'fields'):
+            if hasattr(record, key):
+                data[key] = getattr(record, key)
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
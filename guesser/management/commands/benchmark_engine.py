@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+import warnings
+
+from django.core.management.base import BaseCommand, CommandError
+from guesser import synthetic
+from guesser.decision_tree import Guessify
+
+OPERATIONS = ['load_data', 'train_model', 'get_next_question', 'predict',
+              'predict_with_filtering', 'count_candidates']
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+class Command(BaseCommand):
+    help = ('Time the Guessify engine operations on synthetic catalogues of growing size, '
+            'optionally failing on regressions against a saved baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int_list, default=[33, 1000, 10000],
+                            help='Comma-separated catalogue sizes (e.g. 33,100000,1000000)')
+        parser.add_argument('--features', type=int_list, default=[62, 250, 1000],
+                            help='Comma-separated feature counts')
+        parser.add_argument('--format', choices=['csv', 'npz'], default='csv',
+                            help='Catalogue file format load_data reads')
+        parser.add_argument('--strategy', default='information_gain',
+                            help='Question strategy of the benchmarked guesser')
+        parser.add_argument('--samples', type=int, default=200, help='Game states per call benchmark')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per benchmark (median is reported)')
+        parser.add_argument('--max-train-rows', type=int, default=5000,
+                            help='Largest catalogue to train: the tree keeps one class per celebrity, '
+                                 'so its size grows with rows squared')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare with results saved by --save')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Slowdown against the baseline reported as a regression')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] < 2:
+            # load_data and train_model log every run
+            logging.getLogger('guesser.decision_tree').setLevel(logging.WARNING)
+        # One class per celebrity is by design
+        warnings.filterwarnings('ignore', 'The number of unique classes', UserWarning)
+        self.repeat = max(1, options['repeat'])
+        random.seed(options['seed'])
+
+        results = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for n_rows in options['rows']:
+                for n_features in options['features']:
+                    key = f'{n_rows}x{n_features}'
+                    path = os.path.join(tmpdir, f"{key}.{options['format']}")
+                    matrix = synthetic.generate_matrix(n_rows, n_features, options['seed'])
+                    if options['format'] == 'npz':
+                        synthetic.write_npz(path, matrix)
+                    else:
+                        synthetic.write_csv(synthetic.to_frame(matrix), path)
+                    results[key] = self.run(path, options)
+                    os.remove(path)
+                    self.report_size(key, results[key])
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved results to {options['save']}")
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def time(self, func, runs):
+        """Median seconds of `runs` calls of func()"""
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def run(self, path, options):
+        """Seconds per call of every operation on one catalogue"""
+        strategy = options['strategy']
+        heavy_runs = min(self.repeat, 3)
+        results = {'load_data': self.time(lambda: Guessify(strategy).load_data(path), heavy_runs)}
+
+        guesser = Guessify(strategy)
+        guesser.load_data(path)
+        trained = len(guesser.X) <= options['max_train_rows']
+        if trained:
+            results['train_model'] = self.time(guesser.train_model, heavy_runs)
+
+        states = self.game_states(guesser, options['samples'])
+        calls = {
+            'get_next_question': lambda answers, mask: guesser.get_next_question(
+                list(answers), candidates=mask),
+            'count_candidates': lambda answers, mask: guesser.count_candidates(
+                guesser.candidate_mask(answers)),
+        }
+        if trained:
+            calls['predict'] = lambda answers, mask: guesser.predict(answers)
+            calls['predict_with_filtering'] = lambda answers, mask: guesser.predict_with_filtering(
+                answers, mask=mask)
+        elif strategy not in ('information_gain', 'policy'):
+            # The importance strategy needs the trained tree
+            del calls['get_next_question']
+
+        for name, call in calls.items():
+            def run_all(call=call):
+                for answers, mask in states:
+                    call(answers, mask)
+            results[name] = self.time(run_all, self.repeat) / len(states)
+        return results
+
+    def game_states(self, guesser, samples):
+        """(answers, candidate mask) pairs of games 1 to 10 questions in, answered truthfully"""
+        states = []
+        n_features = len(guesser.feature_names)
+        for _ in range(samples):
+            row = guesser.X[random.randrange(len(guesser.X))]
+            features = random.sample(range(n_features), random.randint(1, min(10, n_features)))
+            answers = {guesser.feature_names[i]: 'yes' if row[i] else 'no' for i in features}
+            states.append((answers, guesser.candidate_mask(answers)))
+        return states
+
+    def report_size(self, key, results):
+        self.stdout.write(f'\n{key} (rows x features)')
+        for name in OPERATIONS:
+            if name in results:
+                self.stdout.write(f'  {name:<34}{format_duration(results[name]):>12}')
+            else:
+                self.stdout.write(f"  {name:<34}{'skipped':>12}")
+
+    def compare(self, results, path, tolerance):
+        with open(path) as f:
+            baseline = json.load(f)
+        regressions = []
+        for key, operations in results.items():
+            for name, seconds in operations.items():
+                before = baseline.get(key, {}).get(name)
+                if before and seconds > before * (1 + tolerance):
+                    regressions.append(f'{key} {name}: {format_duration(before)} -> '
+                                       f'{format_duration(seconds)} ({seconds / before:.2f}x)')
+        if regressions:
+            raise CommandError('Slower than the baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regression against {path} (tolerance {tolerance:.0%})'))
+
+
+def format_duration(seconds):
+    if seconds >= 1:
+        return f'{seconds:.2f} s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds * 1e6:.1f} us'
@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from datetime import timedelta
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from guesser.models import GameSession, Answer
+
+# Models whose Meta.indexes are benchmarked (dropped for the "before" run)
+INDEXED_MODELS = [GameSession, Answer]
+
+FEATURES = ['male', 'actor', 'singer', 'athlete', 'american', 'alive', 'blonde', 'oscar', 'married', 'tall']
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the seeded created_at instead of auto_now_add"""
+    fields = [m._meta.get_field('created_at') for m in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Seed a synthetic game history in a throwaway test database and compare the '
+            'hot-path query plans and timings without and with the model indexes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--answers', type=int, default=8, help='Answers per game')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query (median is reported)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--plans', action='store_true', help='Print the full query plans')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        # The seeded rows and the index juggling never touch the configured database
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            start = time.perf_counter()
+            self.seed(options['games'], options['users'], options['answers'])
+            self.stdout.write(f"Seeded {options['games']} games and "
+                              f"{options['games'] * options['answers']} answers "
+                              f"in {time.perf_counter() - start:.1f}s")
+            self.analyze()
+
+            indexes = self.index_sql()
+            self.run_sql([drop for _, drop in indexes])
+            before = self.run_queries(options['repeat'])
+            self.run_sql([create for create, _ in indexes])
+            self.analyze()
+            after = self.run_queries(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.report(before, after, options['plans'])
+
+    def seed(self, n_games, n_users, n_answers):
+        users = User.objects.bulk_create([
+            User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(n_users)
+        ])
+        now = timezone.now()
+        games = []
+        for i in range(n_games):
+            completed = self.rng.random() < 0.8
+            games.append(GameSession(
+                session_key=f'bench-{i}',
+                user=self.rng.choice(users) if self.rng.random() < 0.9 else None,
+                created_at=now - timedelta(seconds=self.rng.randrange(365 * 86400)),
+                is_completed=completed,
+                is_correct=completed and self.rng.random() < 0.7,
+                guessed_celebrity='Bench' if completed else None,
+                question_count=n_answers,
+            ))
+        with explicit_timestamps(GameSession, Answer):
+            games = GameSession.objects.bulk_create(games, batch_size=2000)
+            Answer.objects.bulk_create((
+                Answer(game_session=game, feature=FEATURES[j % len(FEATURES)],
+                       answer=self.rng.choice(['yes', 'no']),
+                       created_at=game.created_at + timedelta(seconds=j * 5))
+                for game in games for j in range(n_answers)
+            ), batch_size=5000)
+
+        self.sample_user = users[0]
+        self.sample_game = games[len(games) // 2]
+
+    def queries(self):
+        """The hot queries of each view, as (name, queryset)"""
+        game, user = self.sample_game, self.sample_user
+        newest = GameSession.objects.order_by('-created_at', '-id')
+        middle = newest[len(newest[:1000]) - 1]
+        return [
+            ('play_game: session by key', GameSession.objects.filter(session_key=game.session_key)),
+            ('dashboard: recent completed', GameSession.objects.filter(is_completed=True)
+                .select_related('user').order_by('-created_at', '-id')[:3]),
+            ('games list: first page', newest.select_related('user')[:51]),
+            ('games list: page after cursor', newest.select_related('user').filter(
+                Q(created_at__lt=middle.created_at) | Q(created_at=middle.created_at, id__lt=middle.id))[:51]),
+            ('games list: wrong guesses', newest.filter(is_completed=True, is_correct=False)[:51]),
+            ('player: completed games', GameSession.objects.filter(user=user, is_completed=True)),
+            ('game_answers: answers of a game', Answer.objects.filter(game_session=game)
+                .order_by('created_at')),
+        ]
+
+    def run_queries(self, repeat):
+        results = {}
+        for name, queryset in self.queries():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - start)
+            results[name] = (statistics.median(timings) * 1000, queryset.explain())
+        return results
+
+    def index_sql(self):
+        """(create, drop) SQL for every benchmarked index"""
+        editor = connection.schema_editor(collect_sql=True)
+        return [(str(index.create_sql(model, editor)), str(index.remove_sql(model, editor)))
+                for model in INDEXED_MODELS for index in model._meta.indexes]
+
+    def run_sql(self, statements):
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def analyze(self):
+        # Fresh planner statistics for the seeded rows
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def report(self, before, after, show_plans):
+        self.stdout.write(f"\n{'query':<36}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for name, (before_ms, before_plan) in before.items():
+            after_ms, after_plan = after[name]
+            self.stdout.write(f'{name:<36}{before_ms:>12.3f}{after_ms:>12.3f}'
+                              f'{before_ms / after_ms if after_ms else 0:>9.1f}x')
+            if show_plans:
+                self.stdout.write(f'  before: {before_plan}'.replace('\n', '\n          '))
+                self.stdout.write(f'  after:  {after_plan}'.replace('\n', '\n          '))
@@ -0,0 +1,71 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from guesser import synthetic
+from guesser.decision_tree import Guessify
+from guesser.utils import get_data_path
+
+FORMATS = ('.csv', '.npz')
+
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic celebrity catalogue for scale testing, as a CSV in the '
+            'schema load_data reads and/or its columnar .npz form')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='+', help='Output files, .csv and/or .npz')
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--features', type=int, default=62)
+        parser.add_argument('--correlation', type=float, default=0.3,
+                            help='Correlation (0 to 1) of features sharing a latent trait')
+        parser.add_argument('--groups', type=int, default=10, help='Number of latent traits')
+        parser.add_argument('--duplicates', type=float, default=0.0,
+                            help='Share of celebrities with the same answers as another one')
+        parser.add_argument('--synthetic-features', action='store_true',
+                            help="Don't start from the real catalogue's feature names and yes rates")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for path in options['output']:
+            if os.path.splitext(path)[1] not in FORMATS:
+                raise CommandError(f'{path}: the output must be a .csv or .npz file')
+        if options['rows'] < 1 or options['features'] < 1:
+            raise CommandError('--rows and --features must be at least 1')
+
+        base_features, rates = [], None
+        if not options['synthetic_features']:
+            # The real questions and how often they are answered "yes"
+            real = Guessify.read_csv(get_data_path())
+            base_features = [col for col in real.columns if col != 'name']
+            rates = real[base_features].mean().to_numpy()
+
+        start = time.perf_counter()
+        try:
+            matrix = synthetic.generate_matrix(
+                options['rows'], options['features'], options['seed'],
+                correlation=options['correlation'], groups=options['groups'],
+                duplicates=options['duplicates'], rates=rates,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        features = synthetic.feature_names(options['features'], base_features)
+        names = synthetic.celebrity_names(options['rows'])
+        self.stdout.write(f"Generated {options['rows']} celebrities x {options['features']} features "
+                          f"in {time.perf_counter() - start:.1f}s")
+
+        # Rows nobody can tell apart, whether copied on purpose or by chance
+        signatures = np.packbits(matrix, axis=1)
+        unique = len(np.unique(signatures, axis=0))
+        self.stdout.write(f'{options["rows"] - unique} celebrities share their answers with another one')
+
+        for path in options['output']:
+            start = time.perf_counter()
+            if path.endswith('.npz'):
+                synthetic.write_npz(path, matrix, names, features)
+            else:
+                synthetic.write_csv(synthetic.to_frame(matrix, names, features), path)
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote {path} ({os.path.getsize(path) / 2 ** 20:.1f} MiB) '
+                f'in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,198 @@
+import csv
+from collections import defaultdict
+import html
+import logging
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from guesser.gameplay import MAX_QUESTIONS
+from guesser.utils import get_data_path
+
+# Pages of one game, in the order they are first hit
+ENDPOINTS = ['start_game', 'play_game', 'submit_answer', 'result', 'confirm_result']
+
+# The test client's response.context is filled from a global signal, which
+# concurrent threads would mix up, so the pages are read from their HTML
+FEATURE_RE = re.compile(r'<input type="hidden" name="feature" value="([^"]*)">')
+GUESS_RE = re.compile(r'<h1[^>]*>\s*(.*?)\s*</h1>', re.S)
+
+
+def load_oracle(path):
+    """
+    Celebrity name -> {feature: answer}, straight from the catalogue CSV;
+    blank cells are answered "don't know"
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row.pop('name'): {feature: value or 'unknown' for feature, value in row.items()}
+                for row in csv.DictReader(f)}
+
+
+class QueryCounter:
+    """connection.execute_wrapper() that counts queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+class Command(BaseCommand):
+    help = ('Play complete games through the page views (start -> play/submit -> result -> '
+            'confirm) with the test client, against a throwaway test database, and report '
+            'throughput, per-endpoint latency and DB queries per game')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=1, help='Concurrent players')
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['games'] < 1:
+            raise CommandError('--games and --threads must be at least 1')
+        self.oracle = load_oracle(get_data_path())
+        self.names = sorted(self.oracle)
+        self.rng = random.Random(options['seed'])
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.game_queries = []
+        self.correct = 0
+        self.errors = []
+
+        if options['verbosity'] < 2:
+            # One log line per game (and per redirect warning) would swamp the report
+            logging.getLogger('guesser.trace').setLevel(logging.WARNING)
+            logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        setup_test_environment()
+        tmpdir = None
+        if connection.vendor == 'sqlite':
+            # The worker threads need one database they can all connect to,
+            # i.e. a file rather than a per-connection in-memory one
+            tmpdir = tempfile.mkdtemp()
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'load_test.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            users = User.objects.bulk_create([
+                User(username=f'load_{i}', email=f'load_{i}@example.com') for i in range(options['users'])
+            ])
+            targets = [self.rng.choice(self.names) for _ in range(options['games'])]
+            self.stdout.write(f"Playing {options['games']} games with {options['threads']} thread(s)...")
+
+            games = iter(enumerate(targets))
+            start = time.perf_counter()
+            threads = [threading.Thread(target=self.worker, args=(games, users))
+                       for _ in range(options['threads'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.report(elapsed)
+
+    def worker(self, games, users):
+        client = Client()
+        player = None
+        try:
+            while True:
+                with self.lock:
+                    job = next(games, None)
+                if job is None or self.errors:
+                    return
+                number, target = job
+                user = users[number % len(users)]
+                if user != player:
+                    client.force_login(user)
+                    player = user
+                try:
+                    self.play(client, target)
+                except Exception as e:
+                    with self.lock:
+                        self.errors.append(f'{target}: {e!r}')
+        finally:
+            # This thread's connection to the test database
+            connection.close()
+
+    def request(self, client, timings, endpoint, method, path, data=None):
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data, secure=True)
+        timings.append((endpoint, time.perf_counter() - start))
+        if response.status_code not in (200, 302):
+            raise RuntimeError(f'{endpoint} returned {response.status_code}')
+        return response
+
+    def play(self, client, target):
+        """One complete game, answering truthfully for `target`"""
+        truth = self.oracle[target]
+        timings = []
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            self.request(client, timings, 'start_game', 'get', '/start/')
+            for _ in range(MAX_QUESTIONS + 1):
+                response = self.request(client, timings, 'play_game', 'get', '/play/')
+                if response.status_code == 302:
+                    break
+                feature = html.unescape(FEATURE_RE.search(response.content.decode()).group(1))
+                self.request(client, timings, 'submit_answer', 'post', '/submit/',
+                             {'feature': feature, 'answer': truth[feature]})
+            else:
+                raise RuntimeError(f'no guess after {MAX_QUESTIONS + 1} questions')
+            response = self.request(client, timings, 'result', 'get', '/result/')
+            correct = html.unescape(GUESS_RE.search(response.content.decode()).group(1)) == target
+            self.request(client, timings, 'confirm_result', 'post', '/confirm/',
+                         {'is_correct': 'yes' if correct else 'no'})
+
+        with self.lock:
+            for endpoint, seconds in timings:
+                self.latencies[endpoint].append(seconds)
+            self.game_queries.append(queries.count)
+            self.correct += correct
+
+    def report(self, elapsed):
+        for error in self.errors[:10]:
+            self.stderr.write(f'Error: {error}')
+        played = len(self.game_queries)
+        if not played:
+            raise CommandError('No game was completed')
+
+        requests = sum(len(values) for values in self.latencies.values())
+        self.stdout.write(f'\n{played} games, {requests} requests in {elapsed:.2f}s: '
+                          f'{requests / elapsed:.1f} requests/s, {played / elapsed:.1f} games/s')
+        self.stdout.write(f'Correct guesses: {self.correct / played * 100:.1f}%')
+        queries = sorted(self.game_queries)
+        self.stdout.write(f'DB queries per game: mean {sum(queries) / played:.1f}, '
+                          f'p50 {percentile(queries, 50)}, max {queries[-1]}')
+
+        self.stdout.write(f"\n{'endpoint':<16}{'requests':>10}{'mean ms':>10}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for endpoint in ENDPOINTS:
+            values = sorted(self.latencies[endpoint])
+            ms = [v * 1000 for v in values]
+            self.stdout.write(f'{endpoint:<16}{len(ms):>10}{sum(ms) / len(ms):>10.2f}'
+                              f'{percentile(ms, 50):>10.2f}{percentile(ms, 95):>10.2f}'
+                              f'{percentile(ms, 99):>10.2f}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.core.cache import cache
+from guesser import stats
+from guesser.models import GameStats
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialised game statistics from the GameSession table'
+
+    def handle(self, *args, **options):
+        # Users with a row before or after the rebuild may have stale cached stats
+        user_ids = set(GameStats.objects.filter(user__isnull=False).values_list('user_id', flat=True))
+        rows = stats.rebuild()
+        user_ids.update(GameStats.objects.filter(user__isnull=False).values_list('user_id', flat=True))
+
+        user_ids = sorted(user_ids)
+        cache.delete(stats.GLOBAL_STATS_KEY)
+        for start in range(0, len(user_ids), 1000):
+            cache.delete_many([stats.user_stats_key(user_id) for user_id in user_ids[start:start + 1000]])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {rows} game stats rows'))
@@ -1,15 +1,15 @@
 from django.core.management.base import BaseCommand
-from guesser.utils import get_guesser
+from guesser import artifacts, utils
 
 class Command(BaseCommand):
-    help = 'Reload the celebrity guesser model'
+    help = 'Retrain the celebrity guesser and publish a new model artifact'
 
     def handle(self, *args, **options):
-        global _guesser_instance
-        from guesser import utils
-        
-        # Force reload
-        utils._guesser_instance = None
-        guesser = get_guesser()
-        
-        self.stdout.write(self.style.SUCCESS('✅ Model reloaded successfully!'))
\ No newline at end of file
+        guesser, path = artifacts.publish(
+            utils.get_data_path(), utils.get_artifact_dir(), utils.get_question_strategy()
+        )
+
+        # Swap it in here; running workers pick up the new pointer on their next check
+        utils.install(guesser)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Model reloaded successfully! Artifact: {path}'))
@@ -0,0 +1,71 @@
+from itertools import groupby
+import time
+
+from django.core.management.base import BaseCommand
+from guesser.game_state import stored_answers
+from guesser.models import GameSession, Answer
+from guesser.utils import get_guesser
+
+class Command(BaseCommand):
+    help = 'Replay the recorded answer history through the current model in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Only replay the most recent N completed games')
+        parser.add_argument('--unfiltered', action='store_true',
+                            help='Use the raw model instead of strict answer filtering')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        guesser = get_guesser()
+
+        games = GameSession.objects.filter(is_completed=True).order_by('-id')
+        if options['limit']:
+            games = games[:options['limit']]
+        games = {g.id: g for g in games.only('id', 'guessed_celebrity', 'is_correct', 'asked_mask',
+                                             'yes_mask', 'answer_order', 'model_version')}
+
+        # Stream answers grouped by game, one dict per game; the games are
+        # selected through the join rather than a (possibly huge) list of ids
+        rows = Answer.objects.filter(game_session__is_completed=True)
+        if options['limit'] and games:
+            # The most recent N completed games are exactly those from the oldest of them on
+            rows = rows.filter(game_session_id__gte=min(games))
+        rows = (rows.order_by('game_session_id', 'created_at')
+                .values_list('game_session_id', 'feature', 'answer')
+                .iterator(chunk_size=options['batch_size']))
+        game_ids = []
+
+        def answer_sets():
+            for game_id, answers in groupby(rows, key=lambda row: row[0]):
+                game_ids.append(game_id)
+                yield {feature: answer for _, feature, answer in answers}
+            # Games recorded without Answer rows (GUESSER_ANSWER_ROWS off)
+            logged = set(game_ids)
+            for game_id, game in games.items():
+                answers = game_id not in logged and stored_answers(game, get_guesser(game.model_version or None))
+                if answers:
+                    game_ids.append(game_id)
+                    yield dict(answers)
+
+        start = time.perf_counter()
+        names, confidences = guesser.predict_batch(answer_sets(), batch_size=options['batch_size'], filtered=not options['unfiltered'])
+        elapsed = time.perf_counter() - start
+
+        replayed = len(game_ids)
+        if not replayed:
+            self.stdout.write('No completed games with answers to replay.')
+            return
+
+        same_guess = sum(1 for game_id, name in zip(game_ids, names)
+                         if games[game_id].guessed_celebrity == name)
+        confirmed = [(game_id, name) for game_id, name in zip(game_ids, names)
+                     if games[game_id].is_correct]
+        confirmed_hits = sum(1 for game_id, name in confirmed
+                             if games[game_id].guessed_celebrity == name)
+
+        self.stdout.write(f'Replayed {replayed} games in {elapsed:.3f}s ({replayed / elapsed:.0f} games/s)')
+        self.stdout.write(f'Same guess as recorded: {same_guess / replayed * 100:.1f}%')
+        if confirmed:
+            self.stdout.write(f'Confirmed-correct games still guessed: '
+                              f'{confirmed_hits}/{len(confirmed)} ({confirmed_hits / len(confirmed) * 100:.1f}%)')
+        self.stdout.write(f'Mean confidence: {confidences.mean() * 100:.1f}%')
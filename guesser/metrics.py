@@ -0,0 +1,181 @@
+"""
+In-process latency metrics.
+
+Every request's duration goes into a histogram per view, and the stages timed
+during the request (DB queries, candidate filtering, question selection,
+predict_proba, template rendering) into a histogram per view and stage. The
+histograms are exported in the Prometheus text format, along with a few
+gauges (like how long the worker took to warm up), and the stages of the
+current request also make up its Server-Timing header (see
+instrumentation.py for the Django side).
+
+Plain Python, so the engine (decision_tree.py) can time its stages without
+importing Django. Timers only record inside collect(), i.e. during a request,
+and cost two perf_counter() calls. Each process keeps its own histograms: with
+several gunicorn workers, every scrape sees the worker that served it.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_METRIC = 'guesser_request_duration_seconds'
+STAGE_METRIC = 'guesser_stage_duration_seconds'
+WARMUP_METRIC = 'guesser_warmup_seconds'
+HELP = {
+    REQUEST_METRIC: 'Request duration by view',
+    STAGE_METRIC: 'Time spent in each stage of a request, by view',
+    WARMUP_METRIC: 'Time the worker took to load the guesser before serving',
+}
+
+# Stage timings of the request being served
+_current = ContextVar('guesser_metrics_timings', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= it) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class Registry:
+    """Histograms and gauges by metric name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._gauges = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def get(self, name, **labels):
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def get_gauge(self, name, **labels):
+        return self._gauges.get((name, tuple(sorted(labels.items()))))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._gauges.clear()
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", le),))} {count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {histogram.sum!r}')
+                    lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+            for name in sorted({name for name, _ in self._gauges}):
+                lines.append(f'# HELP {name} {HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} gauge')
+                for (metric, labels), value in sorted(self._gauges.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_labels(labels)} {float(value)!r}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+registry = Registry()
+
+
+class StageTimings:
+    """Total time and number of calls of each stage during one request"""
+
+    def __init__(self):
+        self.durations = {}
+        self.calls = {}
+
+    def add(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+
+@contextmanager
+def collect():
+    """Collect the stage timings of the code run inside (one request)"""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timer(stage):
+    """Time the block as `stage` of the current request (no-op outside collect())"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - start)
+
+
+def record(view, seconds, timings):
+    """Add a finished request and its stages to the histograms"""
+    registry.observe(REQUEST_METRIC, seconds, view=view)
+    for stage, duration in timings.durations.items():
+        registry.observe(STAGE_METRIC, duration, view=view, stage=stage)
+
+
+def server_timing(timings, seconds):
+    """Server-Timing header value (milliseconds) for a request"""
+    entries = [f'{stage};dur={duration * 1000:.3f}' for stage, duration in timings.durations.items()]
+    entries.append(f'total;dur={seconds * 1000:.3f}')
+    return ', '.join(entries)
+
+
+def render():
+    return registry.render()
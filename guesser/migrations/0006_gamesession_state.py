@@ -0,0 +1,38 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0005_gamesession_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='asked_mask',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='candidate_mask',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='last_feature',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='yes_mask',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0006_gamesession_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='policy_node',
+            field=models.IntegerField(default=-1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0007_gamesession_policy_node'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
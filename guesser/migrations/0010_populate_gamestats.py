@@ -0,0 +1,35 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Q
+
+
+def populate(apps, schema_editor):
+    # A frozen copy of guesser.stats.rebuild() as of this migration, so later
+    # changes to the app code can't change what it does
+    GameSession = apps.get_model('guesser', 'GameSession')
+    GameStats = apps.get_model('guesser', 'GameStats')
+    counters = dict(
+        total_games=Count('id'),
+        completed_games=Count('id', filter=Q(is_completed=True)),
+        correct_games=Count('id', filter=Q(is_completed=True, is_correct=True)),
+    )
+    rows = [GameStats(key='global', **GameSession.objects.aggregate(**counters))]
+    per_user = (GameSession.objects.filter(user__isnull=False)
+                .values('user').annotate(**counters).order_by())
+    for counts in per_user:
+        user_id = counts.pop('user')
+        rows.append(GameStats(key=f'user:{user_id}', user_id=user_id, **counts))
+
+    with transaction.atomic():
+        GameStats.objects.all().delete()
+        GameStats.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0009_gamestats'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0010_populate_gamestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['game_session', 'created_at'], name='answer_game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['user', 'is_completed', '-created_at'], name='game_user_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['is_completed', 'is_correct'], name='game_completed_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['-created_at', '-id'], name='game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['-created_at', '-id'], name='game_completed_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0011_gamesession_answer_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='answer_order',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from itertools import groupby
+
+from django.db import migrations
+
+# The catalogue's feature columns, in order, when this migration was written:
+# the stored answers index into this list (see Guessify.load_data)
+FEATURE_NAMES = [
+    'male', 'still_alive', 'born_in_america', 'actor', 'musician', 'athlete', 'entrepreneur',
+    'politician', 'scientist', 'has_tattoos', 'tall', 'left-handed', 'blue_eyes', 'bald',
+    'long_hair', 'wears_glasses', 'married', 'has_children', 'social_media_active',
+    'considered_a_legend', 'a_rising_star', 'famous', 'has_major_awards', 'a_billionaire',
+    'a_business_owner', 'has_oscar', 'has_grammy', 'multiple_championships',
+    'started_acting_child', 'a_director', 'a_producer', 'theater_background', 'primarily_a_rapper',
+    'primarily_a_pop_musician', 'a_multi-instrumentalist', 'a_songwriter', 'also_a_dancer',
+    'owns_company', 'a_mentor_figure', 'funny', 'controversial', 'fashion_icon', 'educated',
+    'perfectionist', 'quirky', 'vegan', 'an_activist', 'humanitarian_work',
+    'an_environmental_activist', 'a_political_activist', 'loves_dogs', 'a_gamer', 'plays_poker',
+    'a_motorcycle_enthusiast', 'comeback_story', 'troubled_past', 'multilingual', 'speaks_french',
+    'speaks_spanish', 'british_irish', 'canadian', 'australian',
+]
+ORDER_DIGITS = 4
+# model_version of the backfilled games, so their indices are decoded with
+# FEATURE_NAMES (shipped as guesser/data/features-legacy.json) later on
+LEGACY_VERSION = 'legacy'
+
+
+def backfill(apps, schema_editor):
+    # Self-contained, so neither later code changes nor a new catalogue
+    # change what it writes
+    GameSession = apps.get_model('guesser', 'GameSession')
+    Answer = apps.get_model('guesser', 'Answer')
+    index = {f: i for i, f in enumerate(FEATURE_NAMES)}
+    rows = (Answer.objects.order_by('game_session_id', 'created_at', 'id')
+            .values_list('game_session_id', 'feature', 'answer').iterator(chunk_size=5000))
+
+    batch = []
+    for game_id, answers in groupby(rows, key=lambda row: row[0]):
+        asked = yes = 0
+        order = []
+        for _, feature, answer in answers:
+            i = index.get(feature)
+            if i is None or asked >> i & 1:
+                continue
+            asked |= 1 << i
+            if answer == 'yes':
+                yes |= 1 << i
+            order.append(i)
+        batch.append(GameSession(
+            id=game_id,
+            asked_mask=format(asked, 'x'),
+            yes_mask=format(yes, 'x'),
+            answer_order=''.join(format(i, f'0{ORDER_DIGITS}x') for i in order),
+            question_count=len(order),
+            model_version=LEGACY_VERSION,
+        ))
+        if len(batch) >= 500:
+            _flush(GameSession, batch)
+    _flush(GameSession, batch)
+
+
+def _flush(GameSession, batch):
+    GameSession.objects.bulk_update(batch, ['asked_mask', 'yes_mask', 'answer_order', 'question_count',
+                                           'model_version'])
+    batch.clear()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0012_gamesession_answer_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+LEGACY_VERSION = 'legacy'
+
+
+def stamp(apps, schema_editor):
+    # Databases that ran 0013 before it stamped the games it backfilled: the
+    # games without a catalogue version are those, or have no answers at all
+    GameSession = apps.get_model('guesser', 'GameSession')
+    GameSession.objects.filter(model_version='').update(model_version=LEGACY_VERSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0013_backfill_compact_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(stamp, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 14:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guesser', '0014_stamp_legacy_version'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='gamesession',
+            name='candidate_mask',
+        ),
+    ]
@@ -11,6 +11,15 @@ class GameSession(models.Model):
     guessed_celebrity = models.CharField(max_length=100, blank=True, null=True)
     is_correct = models.BooleanField(default=False, null=True, blank=True)
     
+    # Incremental game state (see guesser/game_state.py); masks are hex-encoded bitsets
+    asked_mask = models.TextField(blank=True, default='')  # answered features
+    yes_mask = models.TextField(blank=True, default='')  # features answered 'yes'
+    answer_order = models.TextField(blank=True, default='')  # answered feature indices in order, 4 hex digits each
+    question_count = models.PositiveIntegerField(default=0)
+    last_feature = models.CharField(max_length=100, blank=True, null=True)  # last question put to the player
+    policy_node = models.IntegerField(default=-1)  # node in the precomputed question policy, -1 = off the tree
+    model_version = models.CharField(max_length=64, blank=True, default='')  # catalogue hash the game started on
+    
     def __str__(self):
         if self.user:
             return f"Session by {self.user.username} - {self.created_at}"
@@ -18,6 +27,17 @@ class GameSession(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A player's games by status, newest first
+            models.Index(fields=['user', 'is_completed', '-created_at'], name='game_user_completed_idx'),
+            # Completed/correct filters and the counters rebuild
+            models.Index(fields=['is_completed', 'is_correct'], name='game_completed_correct_idx'),
+            # Newest first, with id as the keyset tie-breaker (admin games list)
+            models.Index(fields=['-created_at', '-id'], name='game_created_idx'),
+            # Recently completed games (admin dashboard)
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_completed=True),
+                         name='game_completed_recent_idx'),
+        ]
 
 class Answer(models.Model):
     game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='answers')
@@ -29,4 +49,31 @@ class Answer(models.Model):
         return f"{self.feature}: {self.answer}"
     
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+        indexes = [
+            # A game's answers in the order they were given
+            models.Index(fields=['game_session', 'created_at'], name='answer_game_created_idx'),
+        ]
+
+class GameStats(models.Model):
+    """
+    Denormalised game counters, updated in the same transaction as the game
+    itself (see guesser/stats.py). One 'global' row plus one row per user;
+    rebuild with `manage.py rebuild_game_stats`.
+    """
+    key = models.CharField(max_length=50, unique=True)  # 'global' or 'user:<id>'
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='game_stats')
+    total_games = models.PositiveIntegerField(default=0)  # started
+    completed_games = models.PositiveIntegerField(default=0)
+    correct_games = models.PositiveIntegerField(default=0)  # completed and confirmed correct
+
+    @property
+    def wrong_games(self):
+        return self.completed_games - self.correct_games
+
+    @property
+    def pending_games(self):
+        return self.total_games - self.completed_games
+
+    def __str__(self):
+        return f"{self.key}: {self.correct_games}/{self.completed_games} correct, {self.total_games} started"
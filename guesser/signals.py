@@ -0,0 +1,14 @@
+"""
+Keep the GameStats counters (stats.py) right however a game is deleted: from
+the dashboard, the Django admin, along with its player, or by any ORM delete.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import stats
+from .models import GameSession
+
+
+@receiver(post_delete, sender=GameSession)
+def game_deleted(sender, instance, **kwargs):
+    stats.record_deleted(instance)
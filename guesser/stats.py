@@ -0,0 +1,166 @@
+"""
+Game statistics.
+
+Counters live in the denormalised GameStats table, bumped in the same
+transaction as every game write (started, completed, confirmed, deleted), so
+reading them is O(1) however many sessions we keep. Deletions are counted by
+a post_delete receiver (signals.py), so games deleted with their player, from
+the Django admin or by any ORM delete are taken out too. Home-page stats are also
+cached for GUESSER_STATS_CACHE_TIMEOUT seconds and invalidated as soon as a
+game is completed or confirmed, so a home-page hit costs a single cache
+lookup (get_many) and no file I/O. With the default per-process LocMemCache,
+invalidation only reaches the current worker (see CACHES in settings.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import GameSession, GameStats
+from .utils import get_guesser
+
+GLOBAL_STATS_KEY = 'guesser:stats:global'
+GLOBAL_ROW = 'global'
+
+
+def user_row(user_id):
+    return f'user:{user_id}'
+
+
+def _bump(game_session, create=True, **deltas):
+    """Add deltas to the global row and the player's row (creating them unless create=False)"""
+    deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    rows = [(GLOBAL_ROW, None)]
+    if game_session.user_id:
+        rows.append((user_row(game_session.user_id), game_session.user_id))
+
+    with transaction.atomic():
+        for key, user_id in rows:
+            if not GameStats.objects.filter(key=key).update(**deltas) and create:
+                GameStats.objects.get_or_create(key=key, defaults={'user_id': user_id})
+                GameStats.objects.filter(key=key).update(**deltas)
+
+
+def record_started(game_session):
+    _bump(game_session, total_games=1)
+
+
+def record_completed(game_session):
+    _bump(game_session, completed_games=1, correct_games=int(bool(game_session.is_correct)))
+
+
+def record_confirmed(game_session, was_correct):
+    """The player confirmed (or corrected) the guess of a completed game"""
+    if game_session.is_completed:
+        _bump(game_session, correct_games=int(bool(game_session.is_correct)) - int(bool(was_correct)))
+
+
+def record_deleted(game_session):
+    """
+    Take a deleted game out of the counters, inside the deleting transaction;
+    the cached stats are dropped once it commits
+    """
+    completed = int(game_session.is_completed)
+    # The player's row is missing if it was deleted with the player first
+    _bump(game_session, create=False, total_games=-1, completed_games=-completed,
+          correct_games=-(completed and int(bool(game_session.is_correct))))
+    keys = [GLOBAL_STATS_KEY]
+    if game_session.user_id:
+        keys.append(user_stats_key(game_session.user_id))
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_game_stats(user=None):
+    """Counters for one user (or globally) as a dict; zeros if nothing was recorded"""
+    key = user_row(user.id) if user is not None else GLOBAL_ROW
+    row = GameStats.objects.filter(key=key).first() or GameStats(key=key)
+    return _as_dict(row)
+
+
+def _as_dict(row):
+    return {
+        'total_games': row.total_games,
+        'completed_games': row.completed_games,
+        'correct_games': row.correct_games,
+        'wrong_games': row.wrong_games,
+        'pending_games': row.pending_games,
+    }
+
+
+def rebuild():
+    """Recompute every GameStats row from the GameSession table"""
+    counters = dict(
+        total_games=Count('id'),
+        completed_games=Count('id', filter=Q(is_completed=True)),
+        correct_games=Count('id', filter=Q(is_completed=True, is_correct=True)),
+    )
+    rows = [GameStats(key=GLOBAL_ROW, **GameSession.objects.aggregate(**counters))]
+    per_user = (GameSession.objects.filter(user__isnull=False)
+                .values('user').annotate(**counters).order_by())
+    for counts in per_user:
+        user_id = counts.pop('user')
+        rows.append(GameStats(key=user_row(user_id), user_id=user_id, **counts))
+
+    with transaction.atomic():
+        GameStats.objects.all().delete()
+        GameStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def user_stats_key(user_id):
+    return f'guesser:stats:user:{user_id}'
+
+
+def get_cache_timeout():
+    return getattr(settings, 'GUESSER_STATS_CACHE_TIMEOUT', 60)
+
+
+def _home_stats(row):
+    total, correct = row.completed_games, row.correct_games
+    return {
+        'total_games': total,
+        'correct_guesses': correct,
+        'win_rate': round(correct / total * 100) if total > 0 else 0,
+    }
+
+
+def get_home_stats(user):
+    """Global stats, plus the user's own stats when logged in"""
+    # cache key -> GameStats row key
+    keys = {GLOBAL_STATS_KEY: GLOBAL_ROW}
+    if user.is_authenticated:
+        keys[user_stats_key(user.id)] = user_row(user.id)
+
+    cached = cache.get_many(list(keys))
+    missing = {}
+
+    if len(cached) < len(keys):
+        # One indexed read of the materialised counters on a cache miss
+        rows = {row.key: row for row in GameStats.objects.filter(key__in=keys.values())}
+        missing = {
+            cache_key: _home_stats(rows.get(row_key, GameStats()))
+            for cache_key, row_key in keys.items()
+            if cache_key not in cached
+        }
+        cache.set_many(missing, get_cache_timeout())
+    cached.update(missing)
+
+    global_stats = cached[GLOBAL_STATS_KEY]
+    user_stats = cached.get(user_stats_key(user.id)) if user.is_authenticated else None
+
+    return {
+        'total_celebrities': get_guesser().n_celebrities,
+        'total_games': global_stats['total_games'],
+        'win_rate': global_stats['win_rate'],
+        'user_stats': user_stats,
+    }
+
+
+def invalidate(user=None):
+    """Drop the cached stats after a game is completed or confirmed"""
+    keys = [GLOBAL_STATS_KEY]
+    if user is not None and user.is_authenticated:
+        keys.append(user_stats_key(user.id))
+    cache.delete_many(keys)
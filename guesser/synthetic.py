@@ -0,0 +1,101 @@
+"""
+Synthetic celebrity catalogues for scale testing, in the CSV schema that
+Guessify.load_data() reads: a `name` column plus one yes/no column per
+feature. write_npz() stores the same catalogue in a columnar binary form,
+which load_data() also reads: far smaller, and with no text to parse.
+
+Each feature is answered "yes" with its own rate, so some questions split the
+catalogue evenly and others hardly at all, as in the real one. Features are
+tied to a few latent traits (like actor/oscar/famous), so that `correlation`
+controls how much features of the same trait agree; and `duplicates` is the
+share of celebrities whose answers copy another celebrity's, i.e. who cannot
+be told apart by any question.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def feature_names(n_features, base=None):
+    """`base` names first (e.g. the real catalogue's), then numbered ones"""
+    base = list(base or [])[:n_features]
+    return base + [f'feature_{i:04d}' for i in range(len(base), n_features)]
+
+
+def celebrity_names(n_rows):
+    width = len(str(n_rows))
+    return [f'Celebrity {i:0{width}d}' for i in range(n_rows)]
+
+
+def generate_matrix(n_rows, n_features, seed=0, correlation=0.0, groups=10, duplicates=0.0, rates=None):
+    """
+    (n_rows, n_features) uint8 matrix of 1 (yes) / 0 (no) answers
+    correlation: correlation (0 to 1) of the latent scores of features sharing a trait
+    groups: number of latent traits the features are spread over
+    duplicates: share of rows that repeat another row's answers
+    rates: "yes" rate of the first features (e.g. the real catalogue's), the rest are drawn
+    """
+    if not 0 <= correlation < 1:
+        raise ValueError('correlation must be in [0, 1)')
+    if not 0 <= duplicates < 1:
+        raise ValueError('duplicates must be in [0, 1)')
+    rng = np.random.default_rng(seed)
+    yes_rates = rng.uniform(0.05, 0.6, size=n_features)
+    if rates is not None:
+        given = np.clip(np.asarray(rates, dtype=float)[:n_features], 0.01, 0.99)
+        yes_rates[:len(given)] = given
+
+    # Latent score of each (row, feature): its trait's share plus its own noise,
+    # so every score is standard normal and "yes" below the rate's quantile
+    thresholds = np.array([NormalDist().inv_cdf(rate) for rate in yes_rates], dtype=np.float32)
+    trait_of = np.arange(n_features) % max(1, groups)
+    matrix = np.empty((n_rows, n_features), dtype=np.uint8)
+    chunk = max(1, 2 ** 22 // max(1, n_features))  # Bound the float scratch space
+    for start in range(0, n_rows, chunk):
+        rows = min(chunk, n_rows - start)
+        scores = rng.standard_normal((rows, n_features), dtype=np.float32)
+        if correlation:
+            traits = rng.standard_normal((rows, max(1, groups)), dtype=np.float32)
+            scores = np.sqrt(1 - correlation) * scores + np.sqrt(correlation) * traits[:, trait_of]
+        matrix[start:start + rows] = scores < thresholds
+
+    n_duplicates = int(round(duplicates * n_rows))
+    if n_duplicates:
+        order = rng.permutation(n_rows)
+        copies, originals = order[:n_duplicates], order[n_duplicates:]
+        matrix[copies] = matrix[rng.choice(originals, size=n_duplicates)]
+    return matrix
+
+
+def to_frame(matrix, names=None, features=None):
+    """The catalogue as load_data's CSV schema"""
+    n_rows, n_features = matrix.shape
+    frame = pd.DataFrame(np.where(matrix == 1, 'yes', 'no'),
+                         columns=features or feature_names(n_features))
+    frame.insert(0, 'name', names or celebrity_names(n_rows))
+    return frame
+
+
+def generate(n_rows, n_features, seed=0, **options):
+    """A synthetic catalogue as a DataFrame; options as for generate_matrix()"""
+    return to_frame(generate_matrix(n_rows, n_features, seed, **options))
+
+
+def write_csv(frame, path):
+    frame.to_csv(path, index=False)
+
+
+def write_npz(path, matrix, names=None, features=None):
+    """
+    Columnar binary catalogue (Guessify.read_columnar()): every feature's
+    answers as one little-endian bitset (bit i = row i), plus the names
+    """
+    n_rows, n_features = matrix.shape
+    np.savez_compressed(
+        path,
+        names=np.array(names or celebrity_names(n_rows), dtype=str),
+        features=np.array(features or feature_names(n_features), dtype=str),
+        columns=np.packbits(matrix.T, axis=1, bitorder='little'),
+    )
+
@@ -1,3 +1,618 @@
-from django.test import TestCase
+import gc
+from importlib import import_module
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth.models import User
+
+from guesser import artifacts, game_state, gameplay, metrics, stats, synthetic, utils
+from guesser.decision_tree import OFF_POLICY, Guessify
+from guesser.models import Answer, GameSession, GameStats
+from guesser.utils import get_data_path, get_guesser
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GameApiTests(TestCase):
+    """Play whole games through the JSON API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create_user('player', 'player@example.com', 'password123')
+
+    def setUp(self):
+        self.guesser = get_guesser()
+        self.client.force_login(self.player)
+
+    def start(self):
+        response = self.client.post('/api/v1/games/')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def play(self, target):
+        """Answer every question truthfully for celebrity row `target`"""
+        state = self.start()
+        while state['status'] == 'playing':
+            feature = state['question']['feature']
+            value = self.guesser.X[target, self.guesser.feature_index[feature]]
+            response = self.client.post(f"/api/v1/games/{state['game']}/answer/",
+                                        {'feature': feature, 'answer': 'yes' if value else 'no'},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            state = response.json()
+        return state
+
+    def test_play_guess_and_confirm(self):
+        state = self.play(target=0)
+        self.assertEqual(state['guess'], self.guesser.celebrities[0])
+
+        token = state['game']
+        guess = self.client.get(f'/api/v1/games/{token}/guess/').json()
+        self.assertEqual(guess['guess'], state['guess'])
+        self.assertEqual(guess['asked'], state['asked'])
+
+        response = self.client.post(f'/api/v1/games/{token}/confirm/', {'correct': True},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'game': token, 'correct': True})
+        game = GameSession.objects.get()
+        self.assertTrue(game.is_correct)
+        self.assertEqual(game.user, self.player)
+
+        # Finished games take no more answers
+        response = self.client.post(f'/api/v1/games/{token}/answer/', {'feature': 'male', 'answer': 'yes'})
+        self.assertEqual(response.status_code, 409)
+
+    def test_state_etag(self):
+        token = self.start()['game']
+        response = self.client.get(f'/api/v1/games/{token}/')
+        etag = response['ETag']
+
+        response = self.client.get(f'/api/v1/games/{token}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        feature = self.client.get(f'/api/v1/games/{token}/').json()['question']['feature']
+        token = self.client.post(f'/api/v1/games/{token}/answer/', {'feature': feature, 'answer': 'no'}).json()['game']
+        response = self.client.get(f'/api/v1/games/{token}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['asked'], 1)
+
+    def test_candidates_derived_on_load(self):
+        game = gameplay.start_game(self.player, self.guesser)
+        for feature, answer in [('male', 'yes'), ('actor', 'unknown'), ('musician', 'no')]:
+            gameplay.record_answer(game, self.guesser, feature, answer)
+        loaded = GameSession.objects.get(pk=game.pk)
+        game_state.get_game_guesser(loaded)
+        self.assertEqual(game_state.remaining_mask(loaded), game_state.remaining_mask(game))
+
+    def test_game_is_completed_once(self):
+        game = gameplay.start_game(self.player, self.guesser)
+        stale = GameSession.objects.get(pk=game.pk)
+        mask = game_state.remaining_mask(game)
+        gameplay.make_guess(game, self.guesser, mask)
+        # A concurrent request that loaded the game before it was completed
+        gameplay.make_guess(stale, self.guesser, mask)
+        row = GameStats.objects.get(key='global')
+        self.assertEqual((row.total_games, row.completed_games), (1, 1))
+
+    def test_invalid_requests(self):
+        token = self.start()['game']
+        self.assertEqual(self.client.get('/api/v1/games/1:forged/').status_code, 404)
+        response = self.client.post(f'/api/v1/games/{token}/answer/', {'feature': 'nope', 'answer': 'yes'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(f'/api/v1/games/{token}/guess/').status_code, 409)
+
+        self.client.logout()
+        self.assertEqual(self.client.post('/api/v1/games/').status_code, 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, GUESSER_STATELESS_GAMES=True)
+class StatelessGameApiTests(GameApiTests):
+    """The same games with the state carried in signed tokens"""
+
+    def test_no_database_until_completed(self):
+        state = self.start()
+        self.assertFalse(GameSession.objects.exists())
+
+        first_token = state['game']
+        feature = state['question']['feature']
+        with self.assertNumQueries(0):
+            response = self.client.post(f'/api/v1/games/{first_token}/answer/',
+                                        {'feature': feature, 'answer': 'no'})
+        state = response.json()
+        self.assertEqual(state['asked'], 1)
+        self.assertNotEqual(state['game'], first_token)
+        self.assertFalse(GameSession.objects.exists())
+
+    def test_completed_game_is_saved_once(self):
+        state = self.play(target=1)
+        game = GameSession.objects.get()
+        self.assertTrue(game.is_completed)
+        self.assertEqual(game.question_count, state['asked'])
+        self.assertEqual(len(game.answer_order) // 4, state['asked'])
+
+    def test_tampered_token(self):
+        token = self.start()['game']
+        self.assertEqual(self.client.get(f'/api/v1/games/{token[:-2]}xx/').status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AnswerViewTests(TestCase):
+    """The session game's one-round-trip answer endpoint"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('player', 'player@example.com', 'password123'))
+        self.client.get('/start/')
+        self.client.get('/play/')
+
+    def test_answer_advances(self):
+        feature = GameSession.objects.get().last_feature
+        response = self.client.post('/answer/', {'feature': feature, 'answer': 'no'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Answer.objects.get().feature, feature)
+
+    def test_invalid_answer_is_rejected(self):
+        feature = GameSession.objects.get().last_feature
+        for data in ({'feature': 'nope', 'answer': 'yes'}, {'feature': feature, 'answer': 'maybe'}, {}):
+            response = self.client.post('/answer/', data)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+        self.assertFalse(Answer.objects.exists())
+
+
+class BackfilledGameTests(TestCase):
+    """Games backfilled by migration 0013 stay readable without their Answer rows"""
+
+    def test_decode_without_answer_rows(self):
+        game = GameSession.objects.create(session_key='old-game', is_completed=True, guessed_celebrity='Adele')
+        given = [('musician', 'yes'), ('male', 'no'), ('has_grammy', 'yes')]
+        for feature, answer in given:
+            Answer.objects.create(game_session=game, feature=feature, answer=answer)
+
+        import_module('guesser.migrations.0013_backfill_compact_answers').backfill(apps, None)
+        game.answers.all().delete()
+        game.refresh_from_db()
+
+        self.assertEqual(game.model_version, artifacts.LEGACY_VERSION)
+        history = game_state.answer_history(game, get_guesser())
+        self.assertEqual([(a['feature'], a['answer']) for a in history], given)
+
+
+class GuesserSingletonTests(SimpleTestCase):
+    """Concurrent first requests share a single load of the guesser"""
+
+    def test_first_load_is_single_flight(self):
+        self.addCleanup(setattr, utils, '_guesser_instance', utils._guesser_instance)
+        guesser = get_guesser()
+        utils._guesser_instance = None
+
+        def slow_load(*args):
+            time.sleep(0.05)  # Long enough for every thread to be waiting
+            return guesser
+
+        results = []
+        with mock.patch.object(artifacts, 'load_or_build', side_effect=slow_load) as load, \
+                override_settings(GUESSER_RELOAD_INTERVAL=0):
+            threads = [threading.Thread(target=lambda: results.append(get_guesser())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is guesser for result in results))
+
+
+class HotReloadReplayTests(TestCase):
+    """Games whose catalogue was swapped out keep the answers the player gave"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create_user('player', 'player@example.com', 'password123')
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.artifact_dir = tmpdir.name
+        settings = override_settings(GUESSER_ARTIFACT_DIR=self.artifact_dir, GUESSER_RELOAD_INTERVAL=0,
+                                     GUESSER_ANSWER_ROWS=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        saved = utils._guesser_instance, utils._snapshots.copy(), utils._feature_names.copy()
+        self.addCleanup(self.restore, *saved)
+        self.old, _ = artifacts.publish(get_data_path(), self.artifact_dir, 'information_gain')
+        utils.install(self.old)
+
+        # The same catalogue with its feature columns in reverse order
+        frame = Guessify.read_csv(get_data_path())
+        features = [col for col in frame.columns if col != 'name']
+        reordered = os.path.join(self.artifact_dir, 'reordered.csv')
+        frame[['name'] + features[::-1]].to_csv(reordered, index=False)
+        self.new, _ = artifacts.publish(reordered, self.artifact_dir, 'information_gain')
+
+    def restore(self, instance, snapshots, feature_names):
+        utils._guesser_instance = instance
+        utils._snapshots.clear()
+        utils._snapshots.update(snapshots)
+        utils._feature_names.clear()
+        utils._feature_names.update(feature_names)
+
+    def play_then_reload(self):
+        """A game three answers in on the old catalogue, which is then swapped out"""
+        game = gameplay.start_game(self.player, self.old)
+        for feature, answer in zip(self.old.feature_names[:3], ['yes', 'no', 'yes']):
+            self.assertTrue(gameplay.record_answer(game, self.old, feature, answer))
+        answers = game_state.answers_dict(game, self.old)
+
+        utils.install(self.new)
+        utils._snapshots.pop(self.old.data_hash)
+        os.remove(artifacts.artifact_path(self.artifact_dir, self.old.data_hash))
+        return GameSession.objects.get(pk=game.pk), answers
+
+    def test_replay_onto_reordered_catalogue(self):
+        game, answers = self.play_then_reload()
+        guesser = game_state.get_game_guesser(game)
+        self.assertIs(guesser, self.new)
+        self.assertEqual(game.model_version, self.new.data_hash)
+        self.assertEqual(game_state.answers_dict(game, self.new), answers)
+        history = game_state.answer_history(game, self.new)
+        self.assertEqual({a['feature']: a['answer'] for a in history}, answers)
+
+    def test_unknown_catalogue_is_not_replayed(self):
+        game, _ = self.play_then_reload()
+        os.remove(artifacts.feature_names_path(self.artifact_dir, self.old.data_hash))
+        utils._feature_names.clear()
+
+        self.assertIsNone(game_state.answer_history(game, self.new))
+        with self.assertLogs('guesser.game_state', 'WARNING'):
+            game_state.get_game_guesser(game)
+        self.assertEqual(game_state.answers_dict(game, self.new), {})
+        self.assertEqual(game.question_count, 0)
+
+
+class HomeStatsCacheTests(TestCase):
+    """Cached home-page stats are dropped as soon as a game is completed or confirmed"""
+
+    def setUp(self):
+        cache.clear()
+        self.player = User.objects.create_user('home', 'home@example.com', 'password123')
+
+    def test_confirm_invalidates(self):
+        guesser = get_guesser()
+        self.assertEqual(stats.get_home_stats(self.player)['total_games'], 0)
+
+        game = gameplay.start_game(self.player, guesser)
+        gameplay.make_guess(game, guesser, game_state.remaining_mask(game))
+        home = stats.get_home_stats(self.player)
+        self.assertEqual((home['total_games'], home['user_stats']['correct_guesses']), (1, 0))
+
+        gameplay.confirm(game, True)
+        with self.assertNumQueries(1):
+            home = stats.get_home_stats(self.player)
+        self.assertEqual(home['win_rate'], 100)
+        self.assertEqual(home['user_stats']['correct_guesses'], 1)
+
+        # Served from the cache until the next change
+        with self.assertNumQueries(0):
+            stats.get_home_stats(self.player)
+
+
+class GameTraceTests(TestCase):
+    """Verbose game traces are sampled per game"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.player = User.objects.create_user('tracer', 'tracer@example.com', 'password123')
+
+    def play(self):
+        guesser = get_guesser()
+        game = gameplay.start_game(self.player, guesser)
+        step = gameplay.next_step(game, guesser)
+        while not step['done']:
+            gameplay.record_answer(game, guesser, step['feature'], 'no')
+            step = gameplay.next_step(game, guesser)
+        return game
+
+    def setUp(self):
+        # Capture the records without touching the logger's configured level
+        # (which assertLogs() would lower)
+        self.records = []
+        handler = logging.Handler()
+        handler.emit = self.records.append
+        logger = logging.getLogger('guesser.trace')
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+    def events(self):
+        return [record.event for record in self.records]
+
+    def test_final_guess_only(self):
+        game = self.play()
+        self.assertEqual(self.events(), ['guess.made'])
+        self.assertEqual(self.records[0].game, game.session_key)
+        self.assertEqual(self.records[0].fields['guess'], game.guessed_celebrity)
+
+    @override_settings(GUESSER_TRACE_USERS=['tracer'])
+    def test_traced_user(self):
+        game = self.play()
+        events = self.events()
+        self.assertEqual(events.count('guess.answer'), game.question_count)
+        self.assertEqual(events[-2:], ['guess.candidates', 'guess.made'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, GUESSER_METRICS_TOKEN='scrape-me', GUESSER_SERVER_TIMING=True)
+class LatencyMetricsTests(TestCase):
+    """Request and stage timings reach the Server-Timing header and /metrics/"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.client.force_login(User.objects.create_user('timer', 'timer@example.com', 'password123'))
+
+    def test_stages_and_histograms(self):
+        self.client.get('/start/')
+        response = self.client.get('/play/')
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        for stage in ('db', 'question', 'render', 'total'):
+            self.assertIn(stage, stages)
+
+        histogram = metrics.registry.get(metrics.STAGE_METRIC, view='play_game', stage='render')
+        self.assertEqual(histogram.count, 1)
+
+        self.client.logout()
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('guesser_request_duration_seconds_count{view="play_game"} 1', response.content.decode())
+
+    def test_warmup_gauge(self):
+        self.addCleanup(gc.unfreeze)
+        utils.warm_up()
+        self.client.force_login(User.objects.create_superuser('staff', 'staff@example.com', 'password123'))
+        body = self.client.get('/metrics/').content.decode()
+        self.assertIn('# TYPE guesser_warmup_seconds gauge', body)
+        self.assertIn(f'guesser_warmup_seconds {float(utils.warmup_seconds)!r}', body)
+
+    @override_settings(GUESSER_SERVER_TIMING=False)
+    def test_server_timing_off(self):
+        self.assertNotIn('Server-Timing', self.client.get('/start/'))
+
+
+class CandidateIndexTests(SimpleTestCase):
+    """The yes/no bitsets select the same celebrities as filtering the catalogue rows"""
+
+    def test_bitsets_match_row_filtering(self):
+        guesser = Guessify()
+        data = guesser.load_data(get_data_path())
+        rng = random.Random(0)
+        for _ in range(200):
+            features = rng.sample(guesser.feature_names, rng.randint(0, 8))
+            answers = {f: rng.choice(['yes', 'no', 'unknown', 'probably', 'probably_not']) for f in features}
+
+            # The pandas filtering the bitsets replaced: only clear yes/no answers filter
+            rows = data
+            for feature, answer in answers.items():
+                if answer in ('yes', 'no'):
+                    rows = rows[rows[feature] == (1 if answer == 'yes' else 0)]
+
+            mask = guesser.candidate_mask(answers)
+            self.assertEqual(guesser.count_candidates(mask), len(rows))
+            self.assertEqual(list(guesser.candidate_names(mask)), rows['name'].tolist())
+
+
+def small_catalogue(tmpdir):
+    """
+    A hand-built catalogue of 8 celebrities as a CSV: `a` splits them 4/4,
+    `b` 3/5, `c` 3/5, `d` 1/7 and `e` not at all
+    """
+    yes = {'a': {0, 1, 2, 3}, 'b': {0, 1, 5}, 'c': {0, 4, 5}, 'd': {0}, 'e': set()}
+    path = os.path.join(tmpdir, 'small.csv')
+    with open(path, 'w') as f:
+        f.write('name,' + ','.join(yes) + '\n')
+        for row in range(8):
+            f.write(f'Celebrity {row},' + ','.join('yes' if row in rows else 'no' for rows in yes.values()) + '\n')
+    return path
+
+
+class QuestionSelectionTests(SimpleTestCase):
+    """The information_gain strategy asks the question that tells the most"""
+
+    def information_gains(self, guesser, answers):
+        """Expected information gain (bits) of every unanswered feature over the candidates"""
+        rows = guesser.candidate_indices(guesser.candidate_mask(answers))
+        gains = {}
+        for feature in guesser.feature_names:
+            if feature in answers:
+                continue
+            p = guesser.X[rows, guesser.feature_index[feature]].mean()
+            # Celebrities are equally likely, so the gain is the entropy of the split
+            gains[feature] = 0.0 if p in (0, 1) else -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+        return gains
+
+    def test_picks_the_highest_information_gain(self):
+        guesser = Guessify('information_gain')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            guesser.load_data(small_catalogue(tmpdir))
+
+        for answers, expected in [({}, 'a'), ({'a': 'yes'}, 'b'), ({'a': 'no'}, 'c')]:
+            gains = self.information_gains(guesser, answers)
+            chosen = guesser.get_most_informative_question(set(answers), guesser.candidate_mask(answers))
+            self.assertEqual(chosen, expected)
+            self.assertEqual(gains[chosen], max(gains.values()))
+
+        # Nothing left to split: a single candidate
+        answers = {'a': 'yes', 'b': 'yes', 'c': 'yes'}
+        self.assertIsNone(guesser.get_most_informative_question(set(answers), guesser.candidate_mask(answers)))
+
+
+class QuestionPolicyTests(SimpleTestCase):
+    """Games walk the precomputed policy until an answer leaves it"""
+
+    def setUp(self):
+        self.guesser = Guessify('policy')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.guesser.load_data(small_catalogue(tmpdir))
+        self.guesser.build_policy()
+        self.game = GameSession(session_key='policy-walk')
+        self.game.stateless = True  # Nothing to save
+        game_state.init_state(self.game, self.guesser)
+
+    def next_question(self):
+        return self.guesser.get_next_question(game_state.answered_features(self.game, self.guesser),
+                                              candidates=game_state.remaining_mask(self.game),
+                                              node=self.game.policy_node)
+
+    def test_walk_follows_policy_node(self):
+        policy = self.guesser.policy
+        self.assertEqual(self.game.policy_node, 0)
+        self.assertEqual(self.next_question(), 'a')
+
+        game_state.apply_answer(self.game, self.guesser, 'a', 'yes')
+        self.assertEqual(self.game.policy_node, policy['yes'][0])
+        self.assertEqual(self.next_question(), self.guesser.policy_question(self.game.policy_node))
+        self.assertEqual(self.next_question(), 'b')
+
+        game_state.apply_answer(self.game, self.guesser, 'b', 'no')
+        self.assertEqual(self.game.policy_node, policy['no'][policy['yes'][0]])
+
+    def test_off_policy_falls_back_to_information_gain(self):
+        game_state.apply_answer(self.game, self.guesser, 'a', 'no')
+        # 'unknown' is filtered as 'no' but doesn't steer the policy
+        game_state.apply_answer(self.game, self.guesser, 'd', 'no', certain=False)
+        self.assertEqual(self.game.policy_node, OFF_POLICY)
+
+        answered = game_state.answered_features(self.game, self.guesser)
+        expected = self.guesser.get_most_informative_question(answered, game_state.remaining_mask(self.game))
+        self.assertEqual(expected, 'c')
+        self.assertEqual(self.next_question(), expected)
+
+        # So does answering another question than the one the policy asks
+        self.assertEqual(self.guesser.policy_step(self.guesser.policy_root(), 'd', 'yes'), OFF_POLICY)
+
+
+class BatchPredictionTests(SimpleTestCase):
+    """Batched and vectorised predictions agree with the per-answer-set code"""
+
+    def setUp(self):
+        self.guesser = get_guesser()
+        rng = random.Random(1)
+        self.answer_sets = []
+        for _ in range(300):
+            row = rng.randrange(self.guesser.n_celebrities)
+            features = rng.sample(self.guesser.feature_names, rng.randint(0, 12))
+            # Mostly truthful, sometimes wrong or unsure
+            self.answer_sets.append({
+                f: rng.choice(['yes', 'no', 'unknown']) if rng.random() < 0.2
+                else 'yes' if self.guesser.X[row, self.guesser.feature_index[f]] else 'no'
+                for f in features
+            })
+
+    def test_predict_batch_matches_predict(self):
+        names, confidences = self.guesser.predict_batch(iter(self.answer_sets), batch_size=64)
+        matrix = self.guesser.encode_answers(self.answer_sets)
+        array_names, array_confidences = self.guesser.predict_batch(matrix)
+        for i, answers in enumerate(self.answer_sets):
+            expected = self.guesser.predict(answers)
+            self.assertEqual((names[i], array_names[i]), (expected['name'], expected['name']))
+            self.assertAlmostEqual(confidences[i], expected['confidence'])
+            self.assertAlmostEqual(array_confidences[i], expected['confidence'])
+
+    def test_filtered_predictions_match(self):
+        names, confidences = self.guesser.predict_batch(self.answer_sets, batch_size=64, filtered=True)
+        for i, answers in enumerate(self.answer_sets):
+            prediction = self.guesser.predict_with_filtering(answers)
+            self.assertEqual(names[i], prediction['name'])
+            self.assertAlmostEqual(confidences[i], prediction['confidence'])
+
+            expected = self.best_match_by_rows(answers)
+            if expected is None:
+                continue
+            self.assertAlmostEqual(prediction['confidence'], expected[1])
+            if prediction['matches'] == 1:
+                self.assertEqual(prediction['name'], expected[0])
+            else:
+                # Candidates with the same probability may be picked in another order
+                self.assertAlmostEqual(self.probability(answers, prediction['name']), expected[1])
+
+    def probability(self, answers, name):
+        probabilities = self.guesser.model.predict_proba(self.guesser.encode_answers([answers]))[0]
+        return probabilities[list(self.guesser.model.classes_).index(name)]
+
+    def best_match_by_rows(self, answers):
+        """
+        The best-match search predict_with_filtering() replaced: filter the
+        catalogue rows, then scan the classes for the most likely match.
+        None where it fell back to predict() (no match, or all improbable).
+        """
+        data = pd.DataFrame(self.guesser.X, columns=self.guesser.feature_names)
+        data.insert(0, 'name', self.guesser.celebrities)
+        for feature, answer in answers.items():
+            if answer in ('yes', 'no'):
+                data = data[data[feature] == (1 if answer == 'yes' else 0)]
+        if len(data) == 1:
+            return data.iloc[0]['name'], 1.0
+        probabilities = self.guesser.model.predict_proba(self.guesser.encode_answers([answers]))[0]
+        best_match, best_prob = None, 0
+        for idx, celebrity in enumerate(self.guesser.model.classes_):
+            if celebrity in data['name'].values and probabilities[idx] > best_prob:
+                best_match, best_prob = celebrity, probabilities[idx]
+        return (best_match, best_prob) if best_match else None
+
+
+class ArtifactTests(SimpleTestCase):
+    """Trained guessers are saved once per catalogue and reused while it is unchanged"""
+
+    def test_reuse_then_retrain(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = os.path.join(tmpdir, 'catalogue.csv')
+            frame = synthetic.generate(40, 20, seed=2)
+            synthetic.write_csv(frame, csv_path)
+
+            with mock.patch.object(artifacts, 'build', wraps=artifacts.build) as build:
+                built = artifacts.load_or_build(csv_path, tmpdir, 'policy')
+                loaded = artifacts.load_or_build(csv_path, tmpdir, 'policy')
+                self.assertEqual(build.call_count, 1)
+                self.assertEqual(loaded.data_hash, built.data_hash)
+                self.assertEqual(artifacts.read_pointer(tmpdir), built.data_hash)
+                self.assertEqual(loaded.feature_names, built.feature_names)
+                self.assertEqual(loaded.yes_bits, built.yes_bits)
+                self.assertEqual(loaded.policy['feature'].tolist(), built.policy['feature'].tolist())
+                answers = {built.feature_names[0]: 'yes', built.feature_names[1]: 'no'}
+                self.assertEqual(loaded.predict_with_filtering(answers), built.predict_with_filtering(answers))
+
+                # A changed catalogue is retrained and published
+                synthetic.write_csv(frame.iloc[:-1], csv_path)
+                retrained = artifacts.load_or_build(csv_path, tmpdir, 'policy')
+                self.assertEqual(build.call_count, 2)
+                self.assertNotEqual(retrained.data_hash, built.data_hash)
+                self.assertEqual(retrained.n_celebrities, 39)
+                self.assertEqual(artifacts.read_pointer(tmpdir), retrained.data_hash)
+
+
+class SyntheticCatalogueTests(SimpleTestCase):
+    """Generated catalogues load the same from CSV and from the columnar .npz"""
+
+    def test_csv_and_npz_match(self):
+        matrix = synthetic.generate_matrix(300, 40, seed=1, correlation=0.5, duplicates=0.1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path, npz_path = os.path.join(tmpdir, 'c.csv'), os.path.join(tmpdir, 'c.npz')
+            synthetic.write_csv(synthetic.to_frame(matrix), csv_path)
+            synthetic.write_npz(npz_path, matrix)
+            from_csv, from_npz = Guessify(), Guessify()
+            from_csv.load_data(csv_path)
+            from_npz.load_data(npz_path)
+
+        self.assertEqual(from_csv.feature_names, from_npz.feature_names)
+        self.assertEqual(from_csv.celebrities.tolist(), from_npz.celebrities.tolist())
+        self.assertEqual(from_csv.yes_bits, from_npz.yes_bits)
+        # 30 rows were copied from others
+        self.assertLessEqual(len(np.unique(matrix, axis=0)), 270)
@@ -6,7 +6,9 @@ urlpatterns = [
     path('start/', views.start_game, name='start_game'),
     path('play/', views.play_game, name='play_game'),
     path('submit/', views.submit_answer, name='submit_answer'),
+    path('answer/', views.answer_question, name='answer_question'),
     path('result/', views.result, name='result'),
     path('confirm/', views.confirm_result, name='confirm_result'),
-    path("characters_list/",views.characters_list,name="characters_list")
+    path("characters_list/",views.characters_list,name="characters_list"),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,20 +1,192 @@
-from .decision_tree import Guessify
+from . import artifacts, metrics
+from collections import OrderedDict
+import gc
+import logging
 import os
+import threading
+import time
 from django.conf import settings
 
-# Global instance of the guesser
+logger = logging.getLogger(__name__)
+
+# Global instance of the guesser (the currently published artifact). It is a
+# frozen snapshot that is only ever replaced whole, so readers need no lock.
 _guesser_instance = None
+_init_lock = threading.Lock()
 
-def get_guesser():
-    """Get or create the celebrity guesser instance"""
-    global _guesser_instance
-    
+# How long the last warm_up() took, in seconds (also the guesser_warmup_seconds gauge)
+warmup_seconds = None
+
+# Hot reload: recently served guessers by data hash, so in-flight games keep
+# the catalogue they started on after a swap
+KEEP_SNAPSHOTS = 3
+_snapshots = OrderedDict()
+_reload_lock = threading.Lock()
+_pointer_mtime = None
+_next_check = 0.0
+
+# Feature names of catalogues no longer loaded, by data hash
+_feature_names = {}
+
+def get_data_path():
+    """Path of the celebrity catalogue CSV"""
+    return os.path.join(settings.BASE_DIR, 'guesser', 'data', 'guessify_simple.csv')
+
+def get_artifact_dir():
+    """Directory holding the trained model artifacts"""
+    return getattr(settings, 'GUESSER_ARTIFACT_DIR',
+                   os.path.join(settings.BASE_DIR, 'guesser', 'artifacts'))
+
+def get_question_strategy():
+    return getattr(settings, 'GUESSER_QUESTION_STRATEGY', 'policy')
+
+def store_answer_rows():
+    """Whether answers are also logged as Answer rows (see GUESSER_ANSWER_ROWS)"""
+    return getattr(settings, 'GUESSER_ANSWER_ROWS', True)
+
+def get_reload_interval():
+    """Seconds between checks for a newly published artifact (0 disables)"""
+    return getattr(settings, 'GUESSER_RELOAD_INTERVAL', 5.0)
+
+def get_guesser(version=None):
+    """
+    Get or create the celebrity guesser instance
+    version: data hash a game started on; returns that snapshot while it is
+    still available, so a hot reload doesn't change a game mid-way
+    """
     if _guesser_instance is None:
-        _guesser_instance = Guessify()
-        data_path = os.path.join(settings.BASE_DIR, 'guesser', 'data', 'guessify_simple.csv')
-        _guesser_instance.load_data(data_path)  # Loads from CSV
-        _guesser_instance.train_model()          # Retrains the model
-        
-        print("Celebrity Guesser model loaded and trained!")
-    
-    return _guesser_instance
\ No newline at end of file
+        _load_initial()
+    else:
+        _check_for_reload()
+
+    guesser = _guesser_instance
+    if version and version != guesser.data_hash:
+        return _snapshots.get(version) or _load_snapshot(version) or guesser
+    return guesser
+
+def get_feature_names(version):
+    """
+    Feature names, in index order, of the catalogue with this data hash, even
+    after its artifact is gone; None if they are unknown
+    """
+    if not version:
+        return None
+    for guesser in (_guesser_instance, _snapshots.get(version)):
+        if guesser is not None and guesser.data_hash == version:
+            return guesser.feature_names
+    if version not in _feature_names:
+        names = (artifacts.load_feature_names(get_artifact_dir(), version)
+                 # Feature lists shipped with the code (artifacts.LEGACY_VERSION)
+                 or artifacts.load_feature_names(os.path.dirname(get_data_path()), version))
+        if names is None:
+            return None
+        _feature_names[version] = tuple(names)
+    return _feature_names[version]
+
+def _load_initial():
+    """
+    Single-flight first load: concurrent first requests wait for one thread
+    to load (or train) the guesser instead of each building their own
+    """
+    with _init_lock:
+        if _guesser_instance is not None:
+            return
+        # Loads the artifact for the current CSV; only retrains if the data changed
+        guesser = artifacts.load_or_build(
+            get_data_path(), get_artifact_dir(), get_question_strategy()
+        )
+        install(guesser)
+
+        logger.info("Celebrity Guesser model loaded")
+
+def install(guesser):
+    """Atomically make `guesser` the instance served to new games"""
+    with _reload_lock:
+        _swap(guesser)
+
+def _remember(guesser):
+    _snapshots[guesser.data_hash] = guesser
+    _snapshots.move_to_end(guesser.data_hash)
+    while len(_snapshots) > KEEP_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+
+def _check_for_reload():
+    """
+    Swap in a newly published artifact. Polls the pointer file's mtime at
+    most every GUESSER_RELOAD_INTERVAL seconds; requests that already hold a
+    guesser keep using it.
+    """
+    global _pointer_mtime, _next_check
+
+    interval = get_reload_interval()
+    now = time.monotonic()
+    if not interval or now < _next_check:
+        return
+    if not _reload_lock.acquire(blocking=False):
+        # Another thread is already checking; keep serving the current instance
+        return
+    try:
+        _next_check = now + interval
+        try:
+            mtime = os.stat(artifacts.pointer_path(get_artifact_dir())).st_mtime_ns
+        except OSError:
+            return
+        if mtime == _pointer_mtime:
+            return
+        _pointer_mtime = mtime
+
+        digest = artifacts.read_pointer(get_artifact_dir())
+        if not digest or digest == _guesser_instance.data_hash:
+            return
+        guesser = _load_snapshot(digest, locked=True)
+        if guesser is not None:
+            _swap(guesser)
+            logger.info("Guesser hot-reloaded to artifact %s", digest[:16])
+    finally:
+        _reload_lock.release()
+
+def _swap(guesser):
+    global _guesser_instance
+
+    if not getattr(guesser, '_frozen', False):
+        guesser.freeze()
+    _remember(guesser)
+    _guesser_instance = guesser
+
+def _load_snapshot(version, locked=False):
+    """Load the artifact for a given data hash, if it is still on disk"""
+    if version in _snapshots:
+        return _snapshots[version]
+    path = artifacts.artifact_path(get_artifact_dir(), version)
+    guesser = artifacts.load(path, version, get_question_strategy())
+    if guesser is None:
+        return None
+    guesser.freeze()
+    if locked:
+        _remember(guesser)
+    else:
+        with _reload_lock:
+            _remember(guesser)
+    return guesser
+
+def warm_up():
+    """
+    Load the guesser ahead of the first request and record how long it took.
+
+    Meant for the gunicorn master (--preload): afterwards the heap is frozen so
+    the garbage collector doesn't write to the inherited pages in the workers,
+    which keeps them shared copy-on-write.
+    """
+    global warmup_seconds
+
+    start = time.perf_counter()
+    guesser = get_guesser()
+    warmup_seconds = time.perf_counter() - start
+    metrics.registry.set_gauge(metrics.WARMUP_METRIC, warmup_seconds)
+
+    gc.collect()
+    gc.freeze()
+
+    logger.info("Guesser warm-up took %.3fs (%d celebrities, %d features)",
+                warmup_seconds, guesser.n_celebrities, len(guesser.feature_names))
+    return guesser